@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
+import re
 from datetime import datetime
-import time
 import saju_engine  # V2.1 엔진 임포트
+import report_store
+import knowledge_base
+import single_flight
+import lunar_calendar
 
 # ==========================================
 # 1. 페이지 설정 및 스타일 (CSS)
@@ -75,12 +78,111 @@ st.markdown("""
 if 'chat_count' not in st.session_state: st.session_state.chat_count = 0
 if 'messages' not in st.session_state: st.session_state.messages = []
 if 'report' not in st.session_state: st.session_state.report = None
+if 'chat_index' not in st.session_state: st.session_state.chat_index = {}
 
-@st.cache_data
-def load_db_cached():
-    return saju_engine.load_all_dbs()
+@st.cache_resource
+def get_knowledge_base():
+    """DB 파일 변경을 감시하며 바뀐 파일만 교체하는 지식 베이스 (재시작 없이 반영)"""
+    return knowledge_base.KnowledgeBase().start()
 
-db = load_db_cached()
+kb = get_knowledge_base()
+db = kb.snapshot() # 매 실행마다 최신 스냅샷 사용
+
+# [캐시 정책] 동일한 입력(생년월일시, 도시, 성별)은 한 번만 계산하여 모든 세션이 공유
+REPORT_CACHE_TTL = 60 * 60      # 1시간
+REPORT_CACHE_MAX_ENTRIES = 512  # 메모리 상한 (LRU 방식으로 밀려남)
+
+def normalize_birth_dt(birth_dt):
+    """분 단위 이하 값은 만세력에 영향이 없으므로 캐시 키에서 제거"""
+    return birth_dt.replace(second=0, microsecond=0)
+
+@st.cache_resource
+def get_report_store():
+    """프로세스 공용 리포트 저장소 (세션/재시작을 넘어 리포트 재사용)"""
+    return report_store.ReportStore()
+
+store = get_report_store()
+
+# [부하 제어] 동시 계산 수/대기열 상한 (초과 시 기다리게 하지 않고 바로 안내)
+MAX_CONCURRENT_REPORTS = 4
+MAX_QUEUED_REPORTS = 32
+ADMISSION_TIMEOUT = 10.0 # 초
+
+@st.cache_resource
+def get_request_gate():
+    """프로세스 공용 single-flight + 입장 제어"""
+    return single_flight.SingleFlight(), single_flight.AdmissionController(MAX_CONCURRENT_REPORTS, MAX_QUEUED_REPORTS, ADMISSION_TIMEOUT)
+
+flight, admission = get_request_gate()
+
+class UncorrectedReport(Exception):
+    """진시간 보정(지오코딩)에 실패한 리포트. 이번 요청에만 쓰고 저장/캐시하지 않음
+    (st.cache_data는 예외를 캐시하지 않으므로 캐시 함수 안에서 던져 캐시를 건너뜀)"""
+    def __init__(self, report):
+        super().__init__("진시간 보정 실패")
+        self.report = report
+
+def load_or_compute(report_id, compute):
+    """저장소 조회 -> 없으면 동일 요청을 하나로 합쳐 계산 (입장 제어 + 워커 간 락) 후 저장
+    진시간 보정에 실패한 결과는 저장하지 않음 (다음 요청에서 다시 계산)"""
+    report = store.get(report_id)
+    if report is not None: return report
+
+    def run():
+        with admission.admit(), single_flight.cross_worker_lock(report_id):
+            cached = store.get(report_id) # 락을 기다리는 동안 다른 워커가 먼저 끝냈을 수 있음
+            if cached is not None: return cached
+            result = compute()
+            if result.get('true_dt_corrected', True): store.put(report_id, result)
+            return result
+
+    report = flight.do(report_id, run)
+    if not report.get('true_dt_corrected', True): raise UncorrectedReport(report)
+    return report
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def compute_report_cached(birth_dt, city, gender, _db):
+    # 이름은 분석 결과에 영향을 주지 않으므로 키에서 제외 (표시 직전에 덮어씀)
+    report_id = report_store.make_report_id(birth_dt, city, gender)
+    user_data = {"name": "", "gender": gender, "birth_dt": birth_dt, "city": city}
+    # 저장/캐시에는 섹션 참조만 담고, 문장은 화면에 그리기 직전에 확장
+    report = load_or_compute(report_id, lambda: saju_engine.process_saju_input(user_data, _db, as_refs=True))
+    report['report_id'] = report_id
+    return report
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def compute_compatibility_cached(birth_dt_a, city_a, birth_dt_b, city_b, db_versions, _db):
+    # 궁합 리포트는 문장까지 저장하므로 참조 DB 버전을 키에 포함 (해당 DB 수정 시에만 재계산)
+    report_id = report_store.make_report_id('love', birth_dt_a, city_a, birth_dt_b, city_b, *db_versions)
+    u_a = {"name": "", "gender": "?", "birth_dt": birth_dt_a, "city": city_a}
+    u_b = {"name": "", "gender": "?", "birth_dt": birth_dt_b, "city": city_b}
+    report = load_or_compute(report_id, lambda: saju_engine.process_love_compatibility(u_a, u_b, _db))
+    report['report_id'] = report_id
+    return report
+
+def get_saju_report(user_data, db):
+    """캐시된 엔진 파사드: (생년월일시, 도시, 성별)이 같으면 진시간/리포트 계산을 재사용"""
+    try:
+        report = compute_report_cached(normalize_birth_dt(user_data['birth_dt']), report_store.normalize_city(user_data['city']), user_data['gender'], db)
+    except UncorrectedReport as e:
+        report = e.report
+    report = saju_engine.expand_report(report, db)
+    report['user'] = {**report['user'], 'name': user_data['name']}
+    return report
+
+def get_compatibility_report(u_a, u_b, db):
+    """궁합용 캐시 파사드 (두 사람의 생년월일시/도시 기준)"""
+    try:
+        report = compute_compatibility_cached(
+            normalize_birth_dt(u_a['birth_dt']), report_store.normalize_city(u_a['city']),
+            normalize_birth_dt(u_b['birth_dt']), report_store.normalize_city(u_b['city']),
+            saju_engine.get_db_versions(db, 'compatibility', 'love'), db
+        )
+    except UncorrectedReport as e:
+        report = e.report
+    report['user_a']['user'] = {**report['user_a']['user'], 'name': u_a['name']}
+    report['user_b']['user'] = {**report['user_b']['user'], 'name': u_b['name']}
+    return report
 
 # ==========================================
 # 3. 헬퍼 함수: 시각화 및 데이터 포맷팅
@@ -97,9 +199,10 @@ def get_oheng_color(char):
     if '수' in elem: return 'water'
     return ''
 
-def draw_saju_table(saju, name="본인"):
-    """만세력 테이블 그리기 (HTML)"""
-    html = f"""
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_saju_table_html(saju, name):
+    """만세력 테이블 HTML 생성 (명식별 메모이제이션)"""
+    return f"""
     <div style="margin-bottom: 20px;">
         <h4 style="text-align:center; color:#5e35b1;">{name}의 사주 명식</h4>
         <table class="saju-table">
@@ -123,28 +226,46 @@ def draw_saju_table(saju, name="본인"):
         </table>
     </div>
     """
-    st.markdown(html, unsafe_allow_html=True)
+
+def draw_saju_table(saju, name="본인"):
+    """만세력 테이블 그리기 (HTML)"""
+    st.markdown(build_saju_table_html(saju, name), unsafe_allow_html=True)
+
+@st.cache_data(max_entries=REPORT_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_stats_frames(oheng_data, sibseong_data):
+    """차트/비교표용 DataFrame 생성 (리포트별 메모이제이션: 채팅으로 인한 재실행 시 재생성 방지)"""
+    import pandas as pd # 첫 리포트를 그릴 때까지 import 지연 (기동 시간 절약)
+    # oheng_data는 이제 {'visual': ..., 'weighted': ...} 구조임
+    visual = oheng_data['visual']
+    weighted = oheng_data['weighted']
+
+    # 그래프는 '가중치 점수(Weighted)'를 기준으로 그리는 것이 정확함 (신령의 추천)
+    simple_oheng = {k: v for k, v in weighted.items() if k in ['목', '화', '토', '금', '수']}
+    df_oheng = pd.DataFrame.from_dict(simple_oheng, orient='index', columns=['세력(점)'])
+    df_sib = pd.DataFrame.from_dict(sibseong_data['group_counts'], orient='index', columns=['점수'])
+
+    # 비교 테이블용 데이터 가공
+    comparison_data = {
+        '오행': ['목', '화', '토', '금', '수'],
+        '눈에 보이는 개수 (개)': [visual['목'], visual['화'], visual['토'], visual['금'], visual['수']],
+        '실질 세력 점수 (점)': [f"{weighted['목']:.1f}", f"{weighted['화']:.1f}", f"{weighted['토']:.1f}", f"{weighted['금']:.1f}", f"{weighted['수']:.1f}"]
+    }
+    df_comp = pd.DataFrame(comparison_data)
+    return df_oheng, df_sib, df_comp
 
 # [app.py] draw_stats_charts 함수 수정
 
 def draw_stats_charts(oheng_data, sibseong_data):
     """오행 및 십성 차트 그리기 (V2.2 보강: 산출 근거 추가)"""
     col1, col2 = st.columns(2)
-    
-    # oheng_data는 이제 {'visual': ..., 'weighted': ...} 구조임
-    visual = oheng_data['visual']
-    weighted = oheng_data['weighted']
+    df_oheng, df_sib, df_comp = build_stats_frames(oheng_data, sibseong_data)
     
     with col1:
         st.caption("📊 오행 분포 (실질 세력)")
-        # 그래프는 '가중치 점수(Weighted)'를 기준으로 그리는 것이 정확함 (신령의 추천)
-        simple_oheng = {k: v for k, v in weighted.items() if k in ['목', '화', '토', '금', '수']}
-        df_oheng = pd.DataFrame.from_dict(simple_oheng, orient='index', columns=['세력(점)'])
         st.bar_chart(df_oheng, color="#7e57c2", height=200)
         
     with col2:
         st.caption("🌟 십성 강약 (성격 패턴)")
-        df_sib = pd.DataFrame.from_dict(sibseong_data['group_counts'], orient='index', columns=['점수'])
         st.bar_chart(df_sib, color="#26a69a", height=200)
 
     # [옥에 티 보완] 산출 근거 설명 (Expander)
@@ -160,17 +281,35 @@ def draw_stats_charts(oheng_data, sibseong_data):
         
         # 비교 테이블 생성
         st.markdown("###### 🔍 개수 vs 실질 세력 비교")
-        
-        # 데이터프레임 생성을 위한 데이터 가공
-        comparison_data = {
-            '오행': ['목', '화', '토', '금', '수'],
-            '눈에 보이는 개수 (개)': [visual['목'], visual['화'], visual['토'], visual['금'], visual['수']],
-            '실질 세력 점수 (점)': [f"{weighted['목']:.1f}", f"{weighted['화']:.1f}", f"{weighted['토']:.1f}", f"{weighted['금']:.1f}", f"{weighted['수']:.1f}"]
-        }
-        df_comp = pd.DataFrame(comparison_data)
         st.dataframe(df_comp, hide_index=True, use_container_width=True)
         
         st.caption("※ 실질 세력 점수가 높을수록 해당 오행의 기운이 내 삶에 미치는 영향력이 큽니다.")
+def stream_words(text):
+    """챗봇 답변을 단어 단위로 흘려보내는 제너레이터 (st.write_stream용 타이핑 효과)"""
+    # 공백/줄바꿈을 단어에 붙여서 내보내야 마크다운 문단이 유지됨
+    for chunk in re.findall(r"\S+\s*", text):
+        yield chunk
+
+def birth_date_input(is_lunar, key, default):
+    """생년월일 입력. 음력은 양력 달력 위젯으로 고를 수 없는 날(2월 30일 등)이 있어 연/월/일을 따로 받음
+    반환: 양력이면 date, 음력이면 (연, 월, 일, 윤달 여부)"""
+    if not is_lunar:
+        return st.date_input("생년월일 (양력)", key=f"{key}_solar", min_value=datetime(1900, 1, 1), value=default)
+    c_y, c_m, c_d = st.columns([2, 1, 1])
+    year = c_y.number_input("음력 연도", key=f"{key}_ly", min_value=lunar_calendar.LUNAR_MIN_YEAR,
+                            max_value=lunar_calendar.LUNAR_MAX_YEAR, value=default.year, step=1)
+    month = c_m.selectbox("월", list(range(1, 13)), key=f"{key}_lm", index=default.month - 1)
+    day = c_d.selectbox("일", list(range(1, 31)), key=f"{key}_ld", index=default.day - 1)
+    is_leap = st.checkbox("윤달", key=f"{key}_leap", help="음력 윤달에 태어났다면 체크하게.")
+    return int(year), month, day, is_leap
+
+def to_birth_dt(birth_date, birth_time):
+    """birth_date_input 결과 + 시각 -> 양력 datetime (음력 날짜가 없는 날이면 ValueError)
+    음력 입력은 캐시 키가 갈라지지 않도록 여기서 양력으로 환산해 엔진에 넘김"""
+    if isinstance(birth_date, tuple):
+        return saju_engine.resolve_birth_dt({'lunar_date': birth_date, 'birth_time': birth_time})
+    return datetime.combine(birth_date, birth_time)
+
 # ==========================================
 # 4. 메인 UI 구성
 # ==========================================
@@ -181,13 +320,15 @@ tab1, tab2 = st.tabs(["👤 개인 사주 분석", "💞 궁합 분석"])
 
 # --- Tab 1: 개인 사주 ---
 with tab1:
+    # 폼 안의 위젯은 제출 전까지 화면을 다시 그리지 않으므로, 달력 종류는 폼 밖에서 골라 입력칸을 바꿈
+    calendar_type = st.radio("달력", ["양력", "음력"], horizontal=True, key="cal_p", help="음력을 고르면 음력 연/월/일과 윤달 여부를 입력하게.")
     with st.form("personal_form"):
         col1, col2 = st.columns(2)
         with col1:
             name = st.text_input("이름", placeholder="예: 홍길동")
             gender = st.selectbox("성별", ["남", "여"])
         with col2:
-            birth_date = st.date_input("생년월일", min_value=datetime(1900, 1, 1), value=datetime(1995, 1, 1))
+            birth_date = birth_date_input(calendar_type == "음력", "p", datetime(1995, 1, 1))
             birth_time = st.time_input("태어난 시간", value=datetime.now().time())
         
         # 진시간 계산을 위한 도시 입력
@@ -200,36 +341,43 @@ with tab1:
                 st.warning("이름을 입력하게나.")
             else:
                 with st.spinner("신령님이 천기를 살피는 중... (진시간 계산 중)"):
-                    user_data = {
-                        "name": name, "gender": gender,
-                        "birth_dt": datetime.combine(birth_date, birth_time),
-                        "city": city if city else "Seoul"
-                    }
                     try:
-                        report = saju_engine.process_saju_input(user_data, db)
+                        birth_dt = to_birth_dt(birth_date, birth_time)
+                    except ValueError as e:
+                        st.warning(f"음력 날짜를 다시 확인하게: {e}")
+                        st.stop()
+                    user_data = {"name": name, "gender": gender, "birth_dt": birth_dt, "city": city if city else "Seoul"}
+                    try:
+                        report = get_saju_report(user_data, db)
                         st.session_state.report = report
+                        st.session_state.chat_index = saju_engine.build_chat_index(report['analytics'])
                         st.session_state.messages = [] 
                         st.session_state.chat_count = 0
+                    except single_flight.OverloadedError:
+                        st.error("지금 천기를 묻는 이들이 너무 많구먼. 잠시 후 다시 물어보게나.")
                     except Exception as e:
                         st.error(f"분석 중 오류가 발생했네. 도시 이름을 영문으로 정확히 적었는지 확인하게: {e}")
 
 # --- Tab 2: 궁합 분석 ---
 with tab2:
     st.info("💞 두 사람의 태어난 곳과 시간을 정확히 입력해야 진정한 궁합이 나오네.")
+    lunar_col_a, lunar_col_b = st.columns(2)
+    lunar_a = lunar_col_a.checkbox("A 음력 생일", key="la")
+    lunar_b = lunar_col_b.checkbox("B 음력 생일", key="lb")
     with st.form("love_form"):
         col_a, col_b = st.columns(2)
         
         with col_a:
             st.markdown("###### 본인 (A)")
             name_a = st.text_input("이름", key="na")
-            date_a = st.date_input("생일", key="da", value=datetime(1990, 1, 1))
+            date_a = birth_date_input(lunar_a, "da", datetime(1990, 1, 1))
             time_a = st.time_input("시간", key="ta")
             city_a = st.text_input("도시 (영문)", key="ca", placeholder="Seoul")
             
         with col_b:
             st.markdown("###### 상대방 (B)")
             name_b = st.text_input("이름", key="nb")
-            date_b = st.date_input("생일", key="db", value=datetime(1992, 1, 1))
+            date_b = birth_date_input(lunar_b, "db", datetime(1992, 1, 1))
             time_b = st.time_input("시간", key="tb")
             city_b = st.text_input("도시 (영문)", key="cb", placeholder="Seoul")
             
@@ -240,13 +388,21 @@ with tab2:
                 st.warning("두 사람의 이름은 필수라네.")
             else:
                 with st.spinner("두 사람의 인연을 엮어보는 중..."):
-                    u_a = {"name": name_a, "gender": "?", "birth_dt": datetime.combine(date_a, time_a), "city": city_a if city_a else "Seoul"}
-                    u_b = {"name": name_b, "gender": "?", "birth_dt": datetime.combine(date_b, time_b), "city": city_b if city_b else "Seoul"}
                     try:
-                        comp_report = saju_engine.process_love_compatibility(u_a, u_b, db)
+                        birth_dt_a, birth_dt_b = to_birth_dt(date_a, time_a), to_birth_dt(date_b, time_b)
+                    except ValueError as e:
+                        st.warning(f"음력 날짜를 다시 확인하게: {e}")
+                        st.stop()
+                    u_a = {"name": name_a, "gender": "?", "birth_dt": birth_dt_a, "city": city_a if city_a else "Seoul"}
+                    u_b = {"name": name_b, "gender": "?", "birth_dt": birth_dt_b, "city": city_b if city_b else "Seoul"}
+                    try:
+                        comp_report = get_compatibility_report(u_a, u_b, db)
                         st.session_state.report = comp_report
+                        st.session_state.chat_index = saju_engine.build_chat_index(comp_report['analytics'])
                         st.session_state.messages = []
                         st.session_state.chat_count = 0
+                    except single_flight.OverloadedError:
+                        st.error("지금 인연을 묻는 이들이 너무 많구먼. 잠시 후 다시 물어보게나.")
                     except Exception as e:
                         st.error(f"계산 중 실수가 있었구먼: {e}")
 
@@ -277,7 +433,10 @@ if st.session_state.report:
         
         draw_saju_table(report['saju'])
         draw_stats_charts(report['oheng_counts'], report['sibseong_data'])
-    
+
+    if not report.get('true_dt_corrected', True):
+        st.warning("도시 위치를 찾지 못해 진(眞) 시간 보정 없이 입력한 시간 그대로 풀이했네. 잠시 후 다시 물어보게나.")
+
     st.divider()
 
     # 5-2. 분석 카드 (Analytics Cards)
@@ -318,29 +477,9 @@ if st.session_state.report:
                 st.markdown(prompt)
                 
             with st.chat_message("assistant"):
-                msg_placeholder = st.empty()
-                full_response = ""
-                
-                # [Context-Aware Dummy Chatbot]
-                # 실제 LLM 연결 전, 리포트 내용을 기반으로 한 간단한 키워드 매칭 응답
-                context_response = "음, 그건 내 전문이지. "
-                prompt_lower = prompt.lower()
-                
-                if "돈" in prompt or "재물" in prompt:
-                    context_response = "자네 사주의 재성(Money)을 보니 욕심을 부리면 탈이 나겠어. 위에 적힌 '직업 및 적성'을 다시 정독하게."
-                elif "연애" in prompt or "결혼" in prompt or "여자" in prompt or "남자" in prompt:
-                    context_response = "사랑은 흐르는 물과 같네. 억지로 잡으려 하지 말고, '연애 심리' 파트의 조언대로 하게나."
-                elif "건강" in prompt:
-                    context_response = "몸이 곧 자산이네. '건강 진단'에서 말한 색깔의 옷을 자주 입게."
-                else:
-                    context_response = "허허, 천기누설은 함부로 하는 게 아니네. 하지만 자네의 운세는 자네 마음먹기에 달렸다는 걸 잊지 말게."
-
-                # 타이핑 효과
-                for chunk in context_response.split():
-                    full_response += chunk + " "
-                    time.sleep(0.05)
-                    msg_placeholder.markdown(full_response + "▌")
-                msg_placeholder.markdown(full_response)
+                # 리포트 카드 색인에서 질문 의도에 맞는 본문을 찾아 스트리밍 (sleep 없이 렌더링)
+                answer = saju_engine.answer_chat_question(prompt, report['analytics'], st.session_state.chat_index)
+                full_response = st.write_stream(stream_words(answer))
                 
             st.session_state.messages.append({"role": "assistant", "content": full_response})
             st.session_state.chat_count += 1
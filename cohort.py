@@ -0,0 +1,261 @@
+import json
+import os
+import sys
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import report_store
+import rules
+import saju_engine
+import shinsal
+import single_flight
+
+# ==========================================
+# 1. 컬럼 저장소 포맷 (Columnar Cohort Store)
+# ==========================================
+# 입력 1건 = 1행. ReportStore에서 동기화한 행은 리포트 ID(= 정규화된 생년월일시, 도시, 성별)당 1행이므로
+# 같은 입력을 넣은 여러 사용자는 1명으로, 생일을 다르게 넣은 같은 사용자는 여러 명으로 집계됨.
+# 열마다 고정 폭 배열 파일 1개를 두고 모든 파일이 같은 행 순서를 가짐.
+#   pillars    : int8 x 8    8글자 인덱스 (연간, 연지, 월간, 월지, 일간, 일지, 시간, 시지)
+#   weighted   : float32 x 7 오행 가중치 (rules.OHENG_COLUMNS 순서, 0.25 단위라 오차 없음)
+#   groups     : float32 x 5 십성 그룹 점수 (rules.GROUP_COLUMNS 순서)
+#   birth_year : int16       양력 출생 연도
+#   gender     : int8        GENDER_LABELS 인덱스 (-1: 미상)
+#   city       : int32       meta.json의 cities 사전 인덱스
+#   report_key : uint64      리포트 ID(sha1) 앞 8바이트, 동기화 중복 제거용 (append로 직접 넣은 행은 0)
+# meta.json의 rows가 커밋된 행 수. 추가는 각 파일 끝에 덧붙인 뒤 meta를 원자적으로 교체하므로
+# 중간에 실패해도 읽는 쪽은 커밋된 행만 보고, 잘린 꼬리는 다음 추가 때 정리됨.
+STORE_FORMAT_VERSION = 2
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), 'cohort_store')
+
+COLUMNS = {
+    'pillars': (np.int8, 8),
+    'weighted': (np.float32, len(rules.OHENG_COLUMNS)),
+    'groups': (np.float32, len(rules.GROUP_COLUMNS)),
+    'birth_year': (np.int16, 1),
+    'gender': (np.int8, 1),
+    'city': (np.int32, 1),
+    'report_key': (np.uint64, 1),
+}
+
+GENDER_LABELS = ['남', '여']
+UNKNOWN_LABEL = '?'
+
+# 대표 오행/십성: generate_intro_summary와 같은 기준 (최댓값, 동점이면 앞쪽)
+DOMINANT_ELEMENTS = ['목', '화', '금', '수', '토']
+_DOMINANT_ELEMENT_COLS = [rules.OHENG_COLUMNS.index(e) for e in DOMINANT_ELEMENTS]
+
+def get_report_key(report_id: str) -> int:
+    return int(report_id[:16], 16)
+
+def encode_report(report: Dict[str, Any], report_key: int = 0) -> Dict[str, Any]:
+    """개인 리포트(process_saju_input / ReportStore 결과) -> 한 행의 열 값"""
+    user = report['user']
+    weighted = report['oheng_counts']['weighted']
+    group_counts = report['sibseong_data']['group_counts']
+    gender = user.get('gender')
+    return {
+        'pillars': shinsal.pillars_to_indices(report['saju']),
+        'weighted': [weighted[k] for k in rules.OHENG_COLUMNS],
+        'groups': [group_counts[k] for k in rules.GROUP_COLUMNS],
+        'birth_year': saju_engine.resolve_birth_dt(user).year,
+        'gender': GENDER_LABELS.index(gender) if gender in GENDER_LABELS else -1,
+        'city': report_store.normalize_city(user.get('city')),
+        'report_key': report_key,
+    }
+
+# ==========================================
+# 2. 저장소 (Append-Only Store)
+# ==========================================
+class CohortStore:
+    """입력별 명식/점수 열 저장소. 추가는 덧붙이기만 하고, 조회는 커밋된 행을 mmap으로 읽음"""
+
+    def __init__(self, path: str = DEFAULT_STORE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._snapshot: Optional[Tuple[int, Dict[str, np.ndarray], List[str]]] = None
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, f'{name}.bin')
+
+    def _lock(self):
+        """저장소 전용 쓰기 락 (<저장소>/lock). 동기화는 오래 걸리므로 앱의 리포트 ID 락 스트라이프와 공유하지 않음"""
+        return single_flight.file_lock(os.path.join(self.path, 'lock'))
+
+    def _read_meta(self) -> Dict[str, Any]:
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return {'version': STORE_FORMAT_VERSION, 'rows': 0, 'cities': [], 'synced_seq': 0}
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 코호트 저장소 포맷: {self.path}")
+        return meta
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp_path = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, 'meta.json'))
+
+    def _append_rows(self, meta: Dict[str, Any], encoded: List[Dict[str, Any]]) -> int:
+        """(락을 쥔 상태에서) encode_report 결과를 열 파일 끝에 덧붙이고 meta의 행 수를 갱신"""
+        if not encoded: return 0
+
+        city_index = {city: i for i, city in enumerate(meta['cities'])}
+        for row in encoded:
+            if row['city'] not in city_index:
+                city_index[row['city']] = len(meta['cities'])
+                meta['cities'].append(row['city'])
+            row['city'] = city_index[row['city']]
+
+        for name, (dtype, width) in COLUMNS.items():
+            values = np.asarray([row[name] for row in encoded], dtype=dtype)
+            row_bytes = np.dtype(dtype).itemsize * width
+            with open(self._column_path(name), 'ab') as f:
+                f.truncate(meta['rows'] * row_bytes) # 이전 실패로 남은 미커밋 꼬리 제거
+                f.write(values.tobytes())
+        meta['rows'] += len(encoded)
+        return len(encoded)
+
+    def append(self, reports: Iterable[Dict[str, Any]]) -> int:
+        """리포트 여러 개를 한 번에 추가 (기존 행은 다시 쓰지 않음, 중복 확인 없음)"""
+        encoded = [encode_report(r) for r in reports] # 명식 계산/지오코딩은 락 밖에서
+        with self._lock():
+            meta = self._read_meta()
+            added = self._append_rows(meta, encoded)
+            if added: self._write_meta(meta)
+        return added
+
+    def append_users(self, users: Iterable[Dict[str, Any]]) -> int:
+        """사용자 입력(birth_dt 또는 음력 lunar_date + birth_time, city, gender)으로 명식·점수만 계산해서 추가 (문장 생성 없음)"""
+        return self.append(saju_engine.process_saju_input(user, {}, as_refs=True) for user in users)
+
+    def sync_from_report_store(self, store, batch_size: int = 1000) -> int:
+        """ReportStore에 쌓인 개인 리포트 중 마지막 동기화(seq) 이후 것만 이어서 추가
+        다시 저장되어 새 seq를 받은 리포트는 리포트 ID로 걸러서 한 번만 집계"""
+        total = 0
+        with self._lock():
+            meta = self._read_meta()
+            cols, _ = self.columns()
+            known_keys = np.sort(cols['report_key']) # 이미 담긴 리포트 (정렬 후 이진 탐색)
+            seen = set()
+            batch: List[Dict[str, Any]] = []
+            for seq, report_id, report in store.iter_since(meta['synced_seq'], batch_size):
+                meta['synced_seq'] = seq
+                if 'saju' not in report: continue # 궁합 리포트는 제외
+                key = get_report_key(report_id)
+                pos = np.searchsorted(known_keys, key)
+                if key in seen or (pos < len(known_keys) and known_keys[pos] == key): continue
+                seen.add(key)
+                batch.append(encode_report(report, key))
+                if len(batch) >= batch_size:
+                    total += self._append_rows(meta, batch)
+                    self._write_meta(meta)
+                    batch = []
+            total += self._append_rows(meta, batch)
+            self._write_meta(meta)
+        return total
+
+    def __len__(self) -> int:
+        return self._read_meta()['rows']
+
+    def columns(self) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """커밋된 행 전체 -> ({열 이름: 읽기 전용 배열}, 도시 사전). 행 수가 그대로면 기존 매핑 재사용"""
+        meta = self._read_meta()
+        rows = meta['rows']
+        if self._snapshot is not None and self._snapshot[0] == rows:
+            return self._snapshot[1], self._snapshot[2]
+
+        cols = {}
+        for name, (dtype, width) in COLUMNS.items():
+            shape = (rows, width) if width > 1 else (rows,)
+            if rows == 0:
+                cols[name] = np.zeros(shape, dtype=dtype)
+            else:
+                cols[name] = np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=shape)
+        self._snapshot = (rows, cols, list(meta['cities']))
+        return cols, self._snapshot[2]
+
+# ==========================================
+# 3. 집계 (Vectorized Group-By / Histogram)
+# ==========================================
+GROUP_KEYS = ['decade', 'city', 'gender', 'day_gan', 'day_pillar', 'dominant_element', 'dominant_group']
+
+def categorize(cols: Dict[str, np.ndarray], cities: List[str], key: str) -> Tuple[np.ndarray, List[str]]:
+    """범주 키 -> (행별 범주 코드, 범주 이름 목록)"""
+    if key == 'decade':
+        decades = cols['birth_year'].astype(np.int64) // 10 * 10
+        values, codes = np.unique(decades, return_inverse=True)
+        return codes, [f"{v}년대" for v in values]
+    if key == 'city':
+        return cols['city'].astype(np.int64), list(cities)
+    if key == 'gender':
+        codes = cols['gender'].astype(np.int64)
+        return np.where(codes < 0, len(GENDER_LABELS), codes), GENDER_LABELS + [UNKNOWN_LABEL]
+    if key == 'day_gan':
+        return cols['pillars'][:, 4].astype(np.int64), list(saju_engine.GAN)
+    if key == 'day_pillar':
+        gan, ji = cols['pillars'][:, 4].astype(np.int64), cols['pillars'][:, 5].astype(np.int64)
+        return saju_engine.get_ganji_index(gan, ji), list(saju_engine.GANJI_LABELS)
+    if key == 'dominant_element':
+        return np.argmax(cols['weighted'][:, _DOMINANT_ELEMENT_COLS], axis=1), list(DOMINANT_ELEMENTS)
+    if key == 'dominant_group':
+        return np.argmax(cols['groups'], axis=1), list(rules.GROUP_COLUMNS)
+    raise ValueError(f"지원하지 않는 집계 기준: {key} (가능: {', '.join(GROUP_KEYS)})")
+
+def _grouping(cols, cities, by: Optional[str]) -> Tuple[np.ndarray, List[str]]:
+    if by is None: return np.zeros(len(cols['birth_year']), dtype=np.int64), ['전체']
+    return categorize(cols, cities, by)
+
+def histogram(store: CohortStore, field: str, by: Optional[str] = None) -> Dict[str, Any]:
+    """by별 field 분포 -> {'index': by 범주, 'columns': field 범주, 'values': (G, K) 인원수}"""
+    cols, cities = store.columns()
+    values, value_labels = categorize(cols, cities, field)
+    groups, group_labels = _grouping(cols, cities, by)
+    k = len(value_labels)
+    counts = np.bincount(groups * k + values, minlength=len(group_labels) * k)
+    return {'index': group_labels, 'columns': value_labels, 'values': counts.reshape(len(group_labels), k)}
+
+def mean_scores(store: CohortStore, by: Optional[str] = None) -> Dict[str, Any]:
+    """by별 평균 오행 가중치/십성 그룹 점수 -> {'index', 'columns', 'values': (G, 12) 평균, 'counts': (G,) 인원수}"""
+    cols, cities = store.columns()
+    groups, group_labels = _grouping(cols, cities, by)
+    n_groups = len(group_labels)
+    scores = np.hstack([cols['weighted'], cols['groups']]).astype(np.float64)
+    counts = np.bincount(groups, minlength=n_groups)
+    sums = np.column_stack([np.bincount(groups, weights=scores[:, i], minlength=n_groups) for i in range(scores.shape[1])])
+    means = np.divide(sums, counts[:, None], out=np.zeros_like(sums), where=counts[:, None] > 0)
+    return {'index': group_labels, 'columns': rules.OHENG_COLUMNS + rules.GROUP_COLUMNS, 'values': means, 'counts': counts}
+
+def rule_counts(store: CohortStore, by: Optional[str] = None, db: Optional[Dict] = None) -> Dict[str, Any]:
+    """by별 분류 규칙(classification_rules) 해당 인원수 -> {'index', 'columns': 규칙 ID, 'values': (G, R)}"""
+    cols, cities = store.columns()
+    genders = np.asarray(GENDER_LABELS + [UNKNOWN_LABEL])[categorize(cols, cities, 'gender')[0]]
+    day_pillars = np.asarray(saju_engine.GANJI_LABELS)[categorize(cols, cities, 'day_pillar')[0]]
+    tags = saju_engine.tag_charts(rules.build_rule_columns(cols['weighted'], cols['groups'], genders, day_pillars), db)
+
+    groups, group_labels = _grouping(cols, cities, by)
+    rule_ids = list(tags)
+    values = np.column_stack([
+        np.bincount(groups, weights=np.asarray(tags[r], dtype=np.float64), minlength=len(group_labels)) for r in rule_ids
+    ]).astype(np.int64) if rule_ids else np.zeros((len(group_labels), 0), dtype=np.int64)
+    return {'index': group_labels, 'columns': rule_ids, 'values': values}
+
+def format_table(result: Dict[str, Any]) -> str:
+    """집계 결과 -> 콘솔 출력용 텍스트 표"""
+    header = [''] + [str(c) for c in result['columns']]
+    lines = ['\t'.join(header)]
+    for label, row in zip(result['index'], result['values']):
+        lines.append('\t'.join([str(label)] + [f'{v:g}' for v in row]))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    # 사용법: python cohort.py [분포 기준] [그룹 기준]  예) python cohort.py dominant_element decade
+    cohort = CohortStore()
+    added = cohort.sync_from_report_store(report_store.ReportStore())
+    print(f"Synced {added} new reports ({len(cohort)} rows total)")
+    field = sys.argv[1] if len(sys.argv) > 1 else 'dominant_element'
+    by = sys.argv[2] if len(sys.argv) > 2 else 'decade'
+    print(format_table(histogram(cohort, field, by)))
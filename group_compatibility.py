@@ -0,0 +1,106 @@
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+import saju_engine
+
+# ==========================================
+# 1. 궁합 점수 테이블 (Score Tables)
+# ==========================================
+# process_love_compatibility의 점수 = clip(일간 궁합 점수 + 일지 가감점, 0, 100)
+# 일간(10) x 일간(10), 일지(12) x 일지(12) 표로 만들어 두면 N명 전체 행렬을 배열 인덱싱 한 번으로 계산 가능
+
+def build_score_tables(db: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """(일간 기본 점수 10x10, 일지 가감점 12x12)"""
+    base = np.full((10, 10), 50, dtype=np.int16)
+    for i, gan_a in enumerate(saju_engine.GAN):
+        for j, gan_b in enumerate(saju_engine.GAN):
+            comp_data = saju_engine.get_db_content(db, 'compatibility', f"{gan_a}_{gan_b}")
+            if isinstance(comp_data, dict): base[i, j] = comp_data.get('score', 50)
+
+    adjustment = np.zeros((12, 12), dtype=np.int16)
+    for i, ji_a in enumerate(saju_engine.JI):
+        for j, ji_b in enumerate(saju_engine.JI):
+            adjustment[i, j] = saju_engine.get_zizhi_adjustment(ji_a, ji_b, db)[2]
+    return base, adjustment
+
+# ==========================================
+# 2. N명 궁합 행렬 (Group Matrix)
+# ==========================================
+def calculate_group_charts(people: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """사람마다 명식을 정확히 1번 계산 (지오코딩은 도시별 캐시 사용)"""
+    charts = []
+    for user in people:
+        true_dt, _ = saju_engine.get_true_local_time(saju_engine.resolve_birth_dt(user), user.get('city', 'Seoul'))
+        charts.append(saju_engine.calculate_saju_pillars(true_dt))
+    return charts
+
+def calculate_score_matrix(charts: List[Dict[str, str]], db: Dict) -> np.ndarray:
+    """N x N 궁합 점수 행렬. scores[i, j]는 process_love_compatibility(i, j)의 최종 점수와 같음"""
+    base, adjustment = build_score_tables(db)
+    gan = np.fromiter((saju_engine.GAN_INDEX[c['day_gan']] for c in charts), dtype=np.int64, count=len(charts))
+    ji = np.fromiter((saju_engine.JI_INDEX[c['day_ji']] for c in charts), dtype=np.int64, count=len(charts))
+    scores = base[gan[:, None], gan[None, :]] + adjustment[ji[:, None], ji[None, :]]
+    return np.clip(scores, 0, 100)
+
+def calculate_mutual_matrix(scores: np.ndarray) -> np.ndarray:
+    """양방향 평균 점수 행렬 (float32, 0.5 단위라 오차 없음)
+    일간 궁합은 방향이 있으므로 쌍 순위/모임 중심도는 이 대칭 행렬로 계산. 한 번만 만들어 함께 씀"""
+    mutual = scores.astype(np.float32)
+    mutual += scores.T
+    mutual *= 0.5
+    return mutual
+
+PAIR_BLOCK_ROWS = 1024 # 상삼각 마스킹을 행 블록 단위로 해서 N x N 임시 배열을 만들지 않음
+
+def _top_k_desc(values: np.ndarray, k: int) -> np.ndarray:
+    """1차원 배열에서 큰 값 k개의 인덱스 (동점은 앞 인덱스 우선, 값 내림차순 정렬)"""
+    if k >= len(values):
+        idx = np.arange(len(values))
+    else:
+        kth = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        idx = np.sort(np.concatenate([above, ties]))
+    return idx[np.argsort(-values[idx], kind='stable')]
+
+def rank_best_pairs(mutual: np.ndarray, top_k: int = 10) -> List[Tuple[int, int, float]]:
+    """서로 다른 두 사람 (i < j) 중 양방향 평균 점수(calculate_mutual_matrix)가 높은 순으로 top_k 쌍
+    동점은 (i, j) 순서가 빠른 쌍 우선"""
+    n = len(mutual)
+    top_k = min(top_k, n * (n - 1) // 2)
+    if top_k <= 0: return []
+
+    cand_scores, cand_rows, cand_cols = [], [], []
+    cols = np.arange(n)
+    for start in range(0, n - 1, PAIR_BLOCK_ROWS):
+        rows = np.arange(start, min(start + PAIR_BLOCK_ROWS, n - 1))
+        block = np.where(cols[None, :] > rows[:, None], mutual[rows[0]:rows[-1] + 1], -np.inf).ravel()
+        best = _top_k_desc(block, top_k)
+        best = best[np.isfinite(block[best])]
+        cand_scores.append(block[best])
+        cand_rows.append(rows[0] + best // n)
+        cand_cols.append(best % n)
+
+    pair_scores, pair_rows, pair_cols = (np.concatenate(c) for c in (cand_scores, cand_rows, cand_cols))
+    order = np.lexsort((pair_cols, pair_rows, -pair_scores))[:top_k]
+    return [(int(pair_rows[k]), int(pair_cols[k]), float(pair_scores[k])) for k in order]
+
+def order_by_affinity(mutual: np.ndarray) -> List[int]:
+    """다른 사람들과의 평균 궁합(calculate_mutual_matrix)이 높은 순서로 정렬한 인덱스 (모임의 '중심 인물' 찾기)"""
+    n = len(mutual)
+    if n < 2: return list(range(n))
+    mean_affinity = (mutual.sum(axis=1, dtype=np.float64) - np.diag(mutual)) / (n - 1)
+    return [int(i) for i in np.argsort(-mean_affinity, kind='stable')]
+
+def process_group_compatibility(people: List[Dict[str, Any]], db: Dict, top_k: int = 10) -> Dict[str, Any]:
+    """N명 전체 궁합: 명식은 1인 1회, 점수 행렬/양방향 평균 행렬은 각각 벡터 연산 1회"""
+    charts = calculate_group_charts(people)
+    scores = calculate_score_matrix(charts, db)
+    mutual = calculate_mutual_matrix(scores)
+    return {
+        "people": [{"user": user, "saju": saju} for user, saju in zip(people, charts)],
+        "scores": scores,
+        "best_pairs": rank_best_pairs(mutual, top_k),
+        "affinity_order": order_by_affinity(mutual),
+    }
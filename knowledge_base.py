@@ -0,0 +1,97 @@
+import os
+import threading
+from typing import Dict, Any, List, Optional
+
+import saju_engine
+
+# ==========================================
+# 1. 핫 리로드 지식 베이스 (Hot-Reload Knowledge Base)
+# ==========================================
+# db_data/*.json 파일의 mtime을 주기적으로 확인하여, 바뀐 파일만 다시 로드/검증 후 교체함.
+# 스냅샷(dict)은 교체 시 새 객체로 만들어 참조만 바꾸므로, 읽는 쪽은 락 없이 일관된 DB를 봄.
+DEFAULT_POLL_INTERVAL = 2.0 # 초
+
+class KnowledgeBase:
+    def __init__(self, db_dir: str = saju_engine.DB_DIR, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.db_dir = db_dir
+        self.poll_interval = poll_interval
+        # DB별 버전 = 파일 내용 해시 (재시작/다른 워커에서도 같은 내용이면 같은 값)
+        self._versions: Dict[str, Optional[str]] = {key: None for key in saju_engine.DB_FILES}
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        data = {}
+        for key in saju_engine.DB_FILES:
+            self._mtimes[key] = self._get_mtime(key)
+            try:
+                data[key], self._versions[key] = saju_engine.read_db_file(key, db_dir)
+            except (FileNotFoundError, ValueError):
+                data[key] = {}
+                print(f"Warning: Failed to load {saju_engine.DB_FILES[key]}")
+        self._snapshot = self._make_snapshot(data)
+
+    def _get_mtime(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(os.path.join(self.db_dir, saju_engine.DB_FILES[key])).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _make_snapshot(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = dict(data)
+        snapshot[saju_engine.DB_VERSIONS_KEY] = dict(self._versions)
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """현재 DB 스냅샷 (엔진 함수에 그대로 넘기는 db dict)"""
+        return self._snapshot
+
+    def get_versions(self, *keys: str) -> tuple:
+        """현재 스냅샷의 DB 버전 (리포트와 함께 쓸 때는 saju_engine.get_db_versions(db, ...)로
+        계산에 넘긴 것과 같은 스냅샷에서 읽어야 함)"""
+        return saju_engine.get_db_versions(self._snapshot, *keys)
+
+    def check_for_changes(self) -> List[str]:
+        """바뀐 파일만 다시 로드. 검증 실패 시 이전 내용을 유지. 교체된 DB 키 목록 반환"""
+        with self._reload_lock:
+            changed = {}
+            for key in saju_engine.DB_FILES:
+                mtime = self._get_mtime(key)
+                if mtime == self._mtimes.get(key): continue
+                self._mtimes[key] = mtime # 깨진 파일을 매 주기마다 재시도하지 않도록 먼저 기록
+                if mtime is None: continue # 삭제된 파일은 마지막 정상본 유지
+                try:
+                    changed[key] = saju_engine.read_db_file(key, self.db_dir)
+                except (FileNotFoundError, ValueError) as e:
+                    print(f"Warning: Reload rejected for {saju_engine.DB_FILES[key]}: {e}")
+
+            if not changed: return []
+
+            for key, (_, content_version) in changed.items():
+                self._versions[key] = content_version
+            data = {k: v for k, v in self._snapshot.items() if k != saju_engine.DB_VERSIONS_KEY}
+            data.update({key: content for key, (content, _) in changed.items()})
+            self._snapshot = self._make_snapshot(data) # 참조 교체 (원자적)
+        return list(changed)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_for_changes()
+            except Exception as e: # 감시 스레드는 죽지 않도록
+                print(f"Warning: Knowledge base watcher error: {e}")
+
+    def start(self) -> "KnowledgeBase":
+        """백그라운드 감시 스레드 시작"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="kb-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,236 @@
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+# ==========================================
+# 1. 음력 데이터 테이블 (Lunar Month Bitfield)
+# ==========================================
+# 1900~2100년 음력 연도별 정보 (연도당 정수 1개)
+#   bit 0~3   : 윤달 번호 (0이면 윤달 없음)
+#   bit 4~15  : 1~12월이 큰달(30일)인지 여부 (1월이 bit 15, 12월이 bit 4)
+#   bit 16    : 윤달이 큰달인지 여부
+# 한국 표준시(UTC+9, 동경 135도) 기준 삭(朔)/중기(中氣)로 산출하였으므로
+# 중국 음력표와 하루씩 어긋나는 해(예: 1997년 설날)도 한국 달력과 일치함.
+# build_lunar_year_info()로 재생성 가능 (ephem 필요, 실행 시에는 사용하지 않음)
+LUNAR_MIN_YEAR = 1900
+LUNAR_MAX_YEAR = 2100
+LUNAR_BASE_DATE = date(1900, 1, 31) # 음력 1900년 1월 1일
+
+LUNAR_YEAR_INFO = (
+    0x04bd8, 0x04ae0, 0x0a570, 0x05565, 0x0d2a0, 0x0e950, 0x16554, 0x05aa0, 0x0aad0, 0x056d2,  # 1900-1909
+    0x04ae0, 0x0a5d6, 0x0a4d0, 0x0d250, 0x0da95, 0x0b550, 0x056a0, 0x0ada2, 0x095d0, 0x04bb7,  # 1910-1919
+    0x049b0, 0x0a4b0, 0x0b4b5, 0x06a90, 0x0ad40, 0x0bb54, 0x02b60, 0x095b0, 0x05372, 0x04970,  # 1920-1929
+    0x06566, 0x0e4a0, 0x0ea50, 0x16a95, 0x05b50, 0x02b60, 0x18ae3, 0x092e0, 0x1c8d7, 0x0c950,  # 1930-1939
+    0x0d4a0, 0x1d8a6, 0x0b690, 0x056d0, 0x125b4, 0x025d0, 0x092d0, 0x0d2b2, 0x0a950, 0x0d557,  # 1940-1949
+    0x0b4a0, 0x0b550, 0x15555, 0x04db0, 0x025b0, 0x18573, 0x052b0, 0x0a9b8, 0x06950, 0x06aa0,  # 1950-1959
+    0x0aea6, 0x0ab50, 0x04b60, 0x0aae4, 0x0a570, 0x05270, 0x07263, 0x0d950, 0x06b57, 0x056a0,  # 1960-1969
+    0x09ad0, 0x04dd5, 0x04ae0, 0x0a4e0, 0x0d4d4, 0x0d250, 0x0d598, 0x0b540, 0x0d6a0, 0x195a6,  # 1970-1979
+    0x095b0, 0x049b0, 0x0a9b4, 0x0a4b0, 0x0b27a, 0x06a50, 0x06d40, 0x0b756, 0x02b60, 0x095b0,  # 1980-1989
+    0x04b75, 0x04970, 0x064b0, 0x074a3, 0x0ea50, 0x06d98, 0x05ad0, 0x02b60, 0x096e5, 0x092e0,  # 1990-1999
+    0x0c960, 0x0e954, 0x0d4a0, 0x0da50, 0x07552, 0x056c0, 0x0abb7, 0x025d0, 0x092d0, 0x0cab5,  # 2000-2009
+    0x0a950, 0x0b4a0, 0x1b4a3, 0x0b550, 0x055d9, 0x04ba0, 0x0a5b0, 0x05575, 0x052b0, 0x0a950,  # 2010-2019
+    0x0b954, 0x06aa0, 0x0ad50, 0x06b52, 0x04b60, 0x0a6e6, 0x0a570, 0x05270, 0x06a65, 0x0d930,  # 2020-2029
+    0x05aa0, 0x0b6a3, 0x096d0, 0x04afb, 0x04ae0, 0x0a4d0, 0x1d0d6, 0x0d250, 0x0d520, 0x0dd45,  # 2030-2039
+    0x0b6a0, 0x096d0, 0x055b2, 0x049b0, 0x0a577, 0x0a4b0, 0x0b250, 0x1b255, 0x06d40, 0x0ada0,  # 2040-2049
+    0x18b63, 0x09570, 0x14978, 0x04970, 0x064b0, 0x168a6, 0x0ea50, 0x06b20, 0x1aac4, 0x0ab60,  # 2050-2059
+    0x09370, 0x052e3, 0x0c960, 0x0d557, 0x0d4a0, 0x0da50, 0x05d55, 0x056a0, 0x0aad0, 0x095d4,  # 2060-2069
+    0x092d0, 0x0c9b8, 0x0a950, 0x0b4a0, 0x0b6a6, 0x0ad50, 0x055a0, 0x0aba4, 0x0a5b0, 0x052b0,  # 2070-2079
+    0x0b2b3, 0x0a930, 0x07557, 0x06aa0, 0x0ad50, 0x14b55, 0x04b60, 0x0a570, 0x054f4, 0x05260,  # 2080-2089
+    0x0e968, 0x0d530, 0x05aa0, 0x1aaa6, 0x096d0, 0x04ae0, 0x0aad4, 0x0a4d0, 0x0d260, 0x0f253,  # 2090-2099
+    0x0d520,  # 2100-2100
+)
+
+def get_leap_month(year: int) -> int:
+    """해당 음력 연도의 윤달 번호 (없으면 0)"""
+    return LUNAR_YEAR_INFO[year - LUNAR_MIN_YEAR] & 0xf
+
+def get_month_days(year: int, month: int, is_leap: bool = False) -> int:
+    """음력 월의 일수 (29 또는 30)"""
+    info = LUNAR_YEAR_INFO[year - LUNAR_MIN_YEAR]
+    if is_leap: return 30 if info & 0x10000 else 29
+    return 30 if info & (0x10000 >> month) else 29
+
+def get_year_months(year: int) -> List[Tuple[int, bool, int]]:
+    """음력 연도의 월 순서: [(월, 윤달 여부, 일수), ...] (윤달은 같은 번호의 평달 바로 뒤)"""
+    leap = get_leap_month(year)
+    months = []
+    for month in range(1, 13):
+        months.append((month, False, get_month_days(year, month)))
+        if month == leap: months.append((month, True, get_month_days(year, month, True)))
+    return months
+
+# 연도별 1월 1일까지의 누적 일수 및 연도 내 월별 누적 일수 (import 시 1회 계산 -> 변환은 상수 시간)
+_YEAR_OFFSETS: List[int] = []
+_MONTH_OFFSETS: List[Dict[Tuple[int, bool], Tuple[int, int]]] = []
+_offset = 0
+for _year in range(LUNAR_MIN_YEAR, LUNAR_MAX_YEAR + 1):
+    _YEAR_OFFSETS.append(_offset)
+    _months = {}
+    _in_year = 0
+    for _month, _is_leap, _days in get_year_months(_year):
+        _months[(_month, _is_leap)] = (_in_year, _days)
+        _in_year += _days
+    _MONTH_OFFSETS.append(_months)
+    _offset += _in_year
+_YEAR_OFFSETS.append(_offset) # 2100년 음력 연말 다음 날
+del _offset, _year, _months, _in_year, _month, _is_leap, _days
+
+# ==========================================
+# 2. 변환 (Lunar <-> Solar)
+# ==========================================
+def lunar_to_solar(year: int, month: int, day: int, is_leap: bool = False) -> date:
+    """음력 -> 양력. 존재하지 않는 날짜(윤달 없음, 30일 없는 달 등)는 ValueError"""
+    if not LUNAR_MIN_YEAR <= year <= LUNAR_MAX_YEAR:
+        raise ValueError(f"음력 변환은 {LUNAR_MIN_YEAR}~{LUNAR_MAX_YEAR}년만 지원합니다.")
+    entry = _MONTH_OFFSETS[year - LUNAR_MIN_YEAR].get((month, bool(is_leap)))
+    if entry is None:
+        raise ValueError(f"음력 {year}년에는 {'윤' if is_leap else ''}{month}월이 없습니다.")
+    month_offset, days = entry
+    if not 1 <= day <= days:
+        raise ValueError(f"음력 {year}년 {'윤' if is_leap else ''}{month}월은 {days}일까지입니다.")
+    return LUNAR_BASE_DATE + timedelta(days=_YEAR_OFFSETS[year - LUNAR_MIN_YEAR] + month_offset + day - 1)
+
+def solar_to_lunar(solar: date) -> Tuple[int, int, int, bool]:
+    """양력 -> 음력 (연, 월, 일, 윤달 여부)"""
+    offset = (solar - LUNAR_BASE_DATE).days
+    if not 0 <= offset < _YEAR_OFFSETS[-1]:
+        raise ValueError(f"음력 변환은 {LUNAR_MIN_YEAR}~{LUNAR_MAX_YEAR}년만 지원합니다.")
+    # 연도 시작 누적 일수는 단조 증가 -> 평균 연 길이로 추정 후 보정 (최대 1~2회 이동)
+    idx = min(int(offset / 365.2422), len(_YEAR_OFFSETS) - 2)
+    while _YEAR_OFFSETS[idx] > offset: idx -= 1
+    while _YEAR_OFFSETS[idx + 1] <= offset: idx += 1
+    in_year = offset - _YEAR_OFFSETS[idx]
+    for (month, is_leap), (month_offset, days) in _MONTH_OFFSETS[idx].items():
+        if month_offset <= in_year < month_offset + days:
+            return LUNAR_MIN_YEAR + idx, month, in_year - month_offset + 1, is_leap
+    raise ValueError("음력 테이블이 손상되었습니다.") # 도달 불가
+
+# ==========================================
+# 3. 대량 변환 (Vectorized Bulk Conversion)
+# ==========================================
+_bulk_tables = None
+
+def _get_bulk_tables():
+    """numpy 조회 테이블: [연도, 월] 누적 일수/일수 (윤달은 열 0) + 연도별 윤달 번호"""
+    global _bulk_tables
+    if _bulk_tables is None:
+        import numpy as np
+        n = LUNAR_MAX_YEAR - LUNAR_MIN_YEAR + 1
+        # 열 0은 윤달, 열 1~12는 평달. 없는 달은 일수 0으로 두어 검증에서 걸러짐
+        offsets = np.zeros((n, 13), dtype=np.int64)
+        lengths = np.zeros((n, 13), dtype=np.int64)
+        for i, months in enumerate(_MONTH_OFFSETS):
+            for (month, is_leap), (month_offset, days) in months.items():
+                col = 0 if is_leap else month
+                offsets[i, col] = _YEAR_OFFSETS[i] + month_offset
+                lengths[i, col] = days
+        leap_months = np.asarray([info & 0xf for info in LUNAR_YEAR_INFO], dtype=np.int64)
+        _bulk_tables = (offsets, lengths, leap_months)
+    return _bulk_tables
+
+def lunar_to_solar_batch(years, months, days, is_leap=None):
+    """음력 배열 -> 양력 numpy datetime64[D] 배열. 존재하지 않는 날짜가 있으면 ValueError
+    (대량 가입자 데이터 이관 등에서 calculate_saju_pillars 입력을 한 번에 만들 때 사용)"""
+    import numpy as np
+    offsets, lengths, leap_months = _get_bulk_tables()
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    is_leap = np.zeros(years.shape, dtype=bool) if is_leap is None else np.asarray(is_leap, dtype=bool)
+
+    year_ok = (years >= LUNAR_MIN_YEAR) & (years <= LUNAR_MAX_YEAR) & (months >= 1) & (months <= 12)
+    y = np.where(year_ok, years - LUNAR_MIN_YEAR, 0)
+    col = np.where(is_leap, 0, np.where(year_ok, months, 1))
+    month_len = lengths[y, col]
+    leap_ok = ~is_leap | (leap_months[y] == months)
+    valid = year_ok & leap_ok & (days >= 1) & (days <= month_len)
+    if not valid.all():
+        bad = int(np.argmax(~valid))
+        raise ValueError(f"존재하지 않는 음력 날짜 (index {bad}): {years.flat[bad]}-{months.flat[bad]}-{days.flat[bad]}")
+
+    return np.datetime64(LUNAR_BASE_DATE, 'D') + (offsets[y, col] + days - 1)
+
+# ==========================================
+# 4. 빌드 도구 (Offline Table Generation)
+# ==========================================
+KST_OFFSET = timedelta(hours=9)
+
+def _sun_longitude(ephem, when) -> float:
+    import math
+    sun = ephem.Sun()
+    sun.compute(when)
+    return math.degrees(ephem.Ecliptic(sun, epoch=when).lon)
+
+def _find_principal_term(ephem, target_lon: float, guess) -> date:
+    """태양 황경이 target_lon을 지나는 시각(KST 날짜)을 이분법으로 탐색"""
+    def diff(when): return (_sun_longitude(ephem, when) - target_lon + 180) % 360 - 180
+    lo = ephem.Date(guess)
+    while diff(lo) >= 0: lo = ephem.Date(lo - 20)
+    hi = lo
+    while diff(hi) < 0: hi = ephem.Date(hi + 1)
+    lo = ephem.Date(hi - 1)
+    for _ in range(40):
+        mid = ephem.Date((lo + hi) / 2)
+        if diff(mid) < 0: lo = mid
+        else: hi = mid
+    return (ephem.Date(hi).datetime() + KST_OFFSET).date()
+
+def build_lunar_year_info(min_year: int = LUNAR_MIN_YEAR, max_year: int = LUNAR_MAX_YEAR) -> List[int]:
+    """삭(新月)과 중기(황경 30도 배수)로 음력 연도 정보를 산출 (ephem 필요, 수 초 소요)
+    규칙: 삭일이 그 달의 1일, 동지가 든 달이 11월, 동지~동지 사이 13개월이면 중기 없는 첫 달이 윤달"""
+    import ephem
+
+    new_moons = []
+    when = ephem.Date(f'{min_year - 1}/11/01')
+    while not new_moons or new_moons[-1] <= date(max_year + 2, 3, 1):
+        when = ephem.next_new_moon(when)
+        new_moons.append((ephem.Date(when).datetime() + KST_OFFSET).date())
+        when = ephem.Date(when + 1)
+
+    terms = set()
+    for year in range(min_year - 1, max_year + 3):
+        for k in range(12):
+            lon = k * 30
+            guess = ephem.Date(f'{year}/1/1') + (lon - 280) % 360 * 365.2422 / 360 - 5
+            terms.add((_find_principal_term(ephem, lon, guess), lon))
+
+    months = list(zip(new_moons, new_moons[1:]))
+    month_terms = [[lon for t, lon in terms if start <= t < end] for start, end in months]
+    solstice_idx = [i for i, lons in enumerate(month_terms) if 270 in lons]
+
+    labels = {}
+    for a, b in zip(solstice_idx, solstice_idx[1:]):
+        has_leap, leap_used, num = (b - a == 13), False, 11
+        labels[a] = (11, False)
+        for i in range(a + 1, b):
+            if has_leap and not leap_used and not month_terms[i]:
+                labels[i] = (num, True)
+                leap_used = True
+            else:
+                num = num % 12 + 1
+                labels[i] = (num, False)
+
+    by_year: Dict[int, List[Tuple[int, bool, int]]] = {}
+    current_year = None
+    for i in sorted(labels):
+        num, is_leap = labels[i]
+        start, end = months[i]
+        if num == 1 and not is_leap: current_year = start.year
+        if current_year is not None: by_year.setdefault(current_year, []).append((num, is_leap, (end - start).days))
+
+    info = []
+    for year in range(min_year, max_year + 1):
+        bits = 0
+        for num, is_leap, days in by_year[year]:
+            if is_leap:
+                bits |= num
+                if days == 30: bits |= 0x10000
+            elif days == 30:
+                bits |= 0x10000 >> num
+        info.append(bits)
+    return info
+
+if __name__ == '__main__':
+    info = build_lunar_year_info()
+    for i in range(0, len(info), 10):
+        chunk = info[i:i + 10]
+        print('    ' + ', '.join(f'0x{v:05x}' for v in chunk) + f',  # {LUNAR_MIN_YEAR + i}-{LUNAR_MIN_YEAR + i + len(chunk) - 1}')
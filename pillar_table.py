@@ -0,0 +1,134 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Any, Optional, Tuple
+
+import saju_engine
+
+# ==========================================
+# 1. 명식 점수 테이블 (Precomputed Pillar Table)
+# ==========================================
+# 리포트의 수치 부분(오행/십성 점수)은 8글자만으로 결정됨.
+# 연주(60) x 월지(12) x 일주(60) x 시지(12) = 518,400개 조합을 미리 계산해 두고,
+# 실행 시에는 인덱스 계산 1번 + mmap 행 읽기 1번으로 대체함.
+#   (월간은 연간, 시간은 일간에 의해 결정되므로 조합 수에 포함되지 않음)
+#
+# 리스크/건강 플래그는 편집 가능한 분류 규칙(classification_rules.json)에 따라 바뀌므로 담지 않음.
+#
+# [포맷 V3]
+#   헤더 : MAGIC(3B) + VERSION(1B) + 행 수(uint32) + 행 크기(uint8) + 계산 맵 해시(8B)
+#   행   : saju_engine.encode_chart_scores의 정수 22개 (오행 개수 6B + 오행 가중치 x4 6B + 십성 raw 점수 x4 10B)
+#   (V1은 빌드 시점 규칙으로 계산한 플래그 바이트가 붙어 있었음, V2는 맵 해시가 없었음 -> 다시 빌드 필요)
+# 맵 해시는 빌드할 때의 OHENG_MAP/JIJANGGAN_MAP/십성 맵/ENGINE_VERSION으로 만들며,
+# 엔진 쪽 맵이 바뀐 뒤 다시 빌드하지 않은 테이블은 열 때 거부하고 직접 계산으로 대체함.
+TABLE_MAGIC = b'SPT'
+TABLE_FORMAT_VERSION = 3
+DEFAULT_TABLE_PATH = os.path.join(saju_engine.DB_DIR, 'pillar_table.bin')
+
+TABLE_SIZE = 60 * 12 * 60 * 12
+
+_HEADER = struct.Struct('<3sBIB8s')
+_ROW = struct.Struct('<6B6B10B')
+
+def get_maps_hash() -> bytes:
+    """점수 계산에 쓰이는 맵 + 계산 버전의 해시 (8B). 맵의 순서도 계산에 쓰이므로 키 정렬 없이 직렬화"""
+    maps = [
+        saju_engine.ENGINE_VERSION, saju_engine.OHENG_MAP, saju_engine.JIJANGGAN_MAP,
+        {day + target: sib for (day, target), sib in saju_engine.SIBSEONG_MAP.items()},
+        saju_engine.SIBSEONG_GROUP_MAP,
+    ]
+    raw = json.dumps(maps, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).digest()[:8]
+
+def get_table_index(saju_pillars: Dict[str, str]) -> int:
+    """명식 -> 테이블 행 번호"""
+    GAN_INDEX, JI_INDEX = saju_engine.GAN_INDEX, saju_engine.JI_INDEX
+    year_idx = saju_engine.get_ganji_index(GAN_INDEX[saju_pillars['year_gan']], JI_INDEX[saju_pillars['year_ji']])
+    month_idx = (JI_INDEX[saju_pillars['month_ji']] - 2) % 12 # 인월 기준
+    day_idx = saju_engine.get_ganji_index(GAN_INDEX[saju_pillars['day_gan']], JI_INDEX[saju_pillars['day_ji']])
+    time_idx = JI_INDEX[saju_pillars['time_ji']]
+    return ((year_idx * 12 + month_idx) * 60 + day_idx) * 12 + time_idx
+
+def get_pillars_from_index(index: int) -> Dict[str, str]:
+    """테이블 행 번호 -> 명식 (calculate_saju_pillars와 같은 월간/시간 규칙 적용)"""
+    GAN, JI = saju_engine.GAN, saju_engine.JI
+    index, time_idx = divmod(index, 12)
+    index, day_idx = divmod(index, 60)
+    year_idx, month_idx = divmod(index, 12)
+
+    year_gan_idx = year_idx % 10
+    month_gan_start_idx = (year_gan_idx % 5 * 2 + 2) % 10
+    day_gan_idx = day_idx % 10
+    time_gan_start_idx = (day_gan_idx % 5 * 2) % 10
+    return {
+        'year_gan': GAN[year_gan_idx], 'year_ji': JI[year_idx % 12],
+        'month_gan': GAN[(month_gan_start_idx + month_idx) % 10], 'month_ji': JI[(2 + month_idx) % 12],
+        'day_gan': GAN[day_gan_idx], 'day_ji': JI[day_idx % 12],
+        'time_gan': GAN[(time_gan_start_idx + time_idx) % 10], 'time_ji': JI[time_idx]
+    }
+
+def encode_row(saju_pillars: Dict[str, str]) -> bytes:
+    """명식 1개를 기존 계산 함수로 평가하여 행 바이트로 인코딩"""
+    oheng_counts = saju_engine.calculate_five_elements(saju_pillars)
+    sibseong_data = saju_engine.calculate_sibseong_counts(saju_pillars['day_gan'], saju_pillars)
+    return _ROW.pack(*saju_engine.encode_chart_scores(oheng_counts, sibseong_data))
+
+# ==========================================
+# 2. 빌드 도구 (Offline Build)
+# ==========================================
+def build_pillar_table(path: str = DEFAULT_TABLE_PATH) -> str:
+    """전체 조합을 한 번 계산하여 파일로 저장 (수십 초 소요, 배포 전 1회 실행)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(TABLE_MAGIC, TABLE_FORMAT_VERSION, TABLE_SIZE, _ROW.size, get_maps_hash()))
+        for index in range(TABLE_SIZE):
+            f.write(encode_row(get_pillars_from_index(index)))
+    os.replace(tmp_path, path) # 읽는 중인 워커가 깨진 파일을 보지 않도록 교체
+    return path
+
+# ==========================================
+# 3. 런타임 조회 (Memory-Mapped Lookup)
+# ==========================================
+class PillarTable:
+    def __init__(self, path: str = DEFAULT_TABLE_PATH):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rows, row_size, maps_hash = _HEADER.unpack_from(self._mm, 0)
+        if magic != TABLE_MAGIC or version != TABLE_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 명식 테이블 포맷: {path}")
+        if rows != TABLE_SIZE or row_size != _ROW.size:
+            raise ValueError(f"명식 테이블 크기가 맞지 않습니다: {path}")
+        if maps_hash != get_maps_hash():
+            raise ValueError(f"명식 테이블이 현재 엔진의 오행/십성 맵과 다릅니다 (다시 빌드 필요): {path}")
+
+    def read_row(self, index: int) -> Tuple[int, ...]:
+        return _ROW.unpack_from(self._mm, _HEADER.size + index * _ROW.size)
+
+    def lookup(self, saju_pillars: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """명식 -> (오행 점수, 십성 점수). calculate_chart_scores와 같은 구조"""
+        return saju_engine.decode_chart_scores(self.read_row(get_table_index(saju_pillars)))
+
+    def close(self) -> None:
+        self._mm.close()
+
+_default_table: Optional[PillarTable] = None
+_default_table_checked = False
+
+def get_default_table() -> Optional[PillarTable]:
+    """빌드된 테이블이 있으면 열어서 재사용, 없으면 None (엔진은 직접 계산으로 대체)"""
+    global _default_table, _default_table_checked
+    if not _default_table_checked:
+        _default_table_checked = True
+        if os.path.exists(DEFAULT_TABLE_PATH):
+            try:
+                _default_table = PillarTable(DEFAULT_TABLE_PATH)
+            except ValueError as e:
+                print(f"Warning: {e}")
+    return _default_table
+
+if __name__ == '__main__':
+    out = build_pillar_table(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE_PATH)
+    print(f"Built {TABLE_SIZE} rows -> {out}")
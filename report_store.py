@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+import hashlib
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import saju_engine
+
+# ==========================================
+# 1. 직렬화 포맷 (Report Serialization)
+# ==========================================
+# [포맷 V2]
+#   헤더   : MAGIC(3B) + VERSION(1B) + KIND(1B)
+#   수치부 : 개인 리포트일 때만. 8글자 인덱스(8B) + saju_engine.encode_chart_scores의 정수 22개
+#            (오행 개수 6B + 오행 가중치 x4 6 x uint16 + 십성 raw 점수 x4 10 x uint16)
+#   본문   : 나머지(사용자 정보, 진시간, 분석 카드 또는 섹션 참조)를 JSON -> zlib 압축
+# V1 -> V2: 개인 리포트 본문이 분석 카드 전문(analytics) 대신 섹션 참조(sections)로 바뀜.
+#           V1 리포트는 expand_report가 전문을 그대로 돌려주므로 DB 수정이 반영되지 않아 재계산 대상
+REPORT_MAGIC = b'SRP'
+REPORT_FORMAT_VERSION = 2
+
+KIND_PERSONAL = 0
+KIND_GENERIC = 1 # 궁합 등 수치부 레이아웃이 없는 리포트
+
+PILLAR_KEYS = ['year_gan', 'year_ji', 'month_gan', 'month_ji', 'day_gan', 'day_ji', 'time_gan', 'time_ji']
+
+_HEADER = struct.Struct('<3sBB')
+_NUMERIC = struct.Struct('<8B6B6H10H')
+
+def _encode_pillars(saju: Dict[str, str]) -> list:
+    return [(saju_engine.GAN_INDEX if k.endswith('_gan') else saju_engine.JI_INDEX)[saju[k]] for k in PILLAR_KEYS]
+
+def _decode_pillars(indices) -> Dict[str, str]:
+    return {k: (saju_engine.GAN if k.endswith('_gan') else saju_engine.JI)[i] for k, i in zip(PILLAR_KEYS, indices)}
+
+def _json_default(obj):
+    if isinstance(obj, datetime): return {'__dt__': obj.isoformat()}
+    raise TypeError(f"직렬화할 수 없는 타입: {type(obj)}")
+
+def _json_object_hook(obj):
+    if '__dt__' in obj and len(obj) == 1: return datetime.fromisoformat(obj['__dt__'])
+    return obj
+
+def _pack_body(body: Dict[str, Any]) -> bytes:
+    raw = json.dumps(body, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+    return zlib.compress(raw.encode('utf-8'), 9)
+
+def _unpack_body(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob).decode('utf-8'), object_hook=_json_object_hook)
+
+def serialize_report(report: Dict[str, Any]) -> bytes:
+    """리포트(dict) -> 버전 포함 바이너리"""
+    if 'saju' not in report:
+        return _HEADER.pack(REPORT_MAGIC, REPORT_FORMAT_VERSION, KIND_GENERIC) + _pack_body(report)
+
+    numeric = _NUMERIC.pack(
+        *_encode_pillars(report['saju']),
+        *saju_engine.encode_chart_scores(report['oheng_counts'], report['sibseong_data']),
+    )
+    body = {k: v for k, v in report.items() if k not in ('saju', 'oheng_counts', 'sibseong_data')}
+    return _HEADER.pack(REPORT_MAGIC, REPORT_FORMAT_VERSION, KIND_PERSONAL) + numeric + _pack_body(body)
+
+def deserialize_report(blob: bytes) -> Dict[str, Any]:
+    """바이너리 -> 리포트(dict). process_saju_input 결과와 동일한 구조로 복원"""
+    magic, version, kind = _HEADER.unpack_from(blob, 0)
+    if magic != REPORT_MAGIC: raise ValueError("신령 리포트 포맷이 아닙니다.")
+    if version != REPORT_FORMAT_VERSION: raise ValueError(f"지원하지 않는 리포트 버전: {version}")
+
+    offset = _HEADER.size
+    if kind == KIND_GENERIC: return _unpack_body(blob[offset:])
+
+    values = _NUMERIC.unpack_from(blob, offset)
+    report = _unpack_body(blob[offset + _NUMERIC.size:])
+    report['saju'] = _decode_pillars(values[:8])
+    report['oheng_counts'], report['sibseong_data'] = saju_engine.decode_chart_scores(values[8:])
+    return report
+
+# ==========================================
+# 2. 리포트 저장소 (SQLite Key-Value Store)
+# ==========================================
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), 'report_store.sqlite3')
+
+def normalize_city(city: Optional[str]) -> str:
+    """도시 입력 정규화 (공백/대소문자 차이로 리포트 ID와 집계가 갈라지지 않도록). 앱과 코호트 집계가 함께 씀"""
+    city = " ".join((city or "").split())
+    return city.title() if city else "Seoul"
+
+def make_report_id(*parts: Any) -> str:
+    """정규화된 입력값으로 리포트 ID 생성 (같은 입력 + 같은 계산 버전 -> 같은 ID)
+    REPORT_FORMAT_VERSION은 바이트 레이아웃만 나타내므로 계산 로직 버전(ENGINE_VERSION)을 함께 넣음"""
+    key = '|'.join(p.isoformat() if isinstance(p, datetime) else str(p) for p in (f"engine{saju_engine.ENGINE_VERSION}",) + parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+_CREATE_REPORTS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS reports ("
+    " seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, version INTEGER NOT NULL,"
+    " created_at REAL NOT NULL, payload BLOB NOT NULL)"
+)
+
+class ReportStore:
+    """리포트 ID -> 직렬화된 리포트. 인덱스 조회라 건수와 무관하게 일정 시간에 조회됨
+    seq는 저장할 때마다 붙는 증가 번호 (AUTOINCREMENT라 재사용되지 않고, SQLite가 쓰기를 직렬화하므로
+    여러 워커가 써도 커밋 순서대로 커짐). 같은 ID를 다시 저장하면 새 seq를 받으므로 읽는 쪽은 ID로 중복 제거"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # Streamlit은 세션마다 스레드가 다르므로 커넥션 공유 + 락으로 보호
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(reports)")]
+        if columns and 'seq' not in columns:
+            self._migrate_add_seq()
+        self._conn.execute(_CREATE_REPORTS_TABLE)
+        self._conn.commit()
+
+    def _migrate_add_seq(self) -> None:
+        """seq 열이 없던 이전 스키마 -> 저장 순서대로 seq를 매겨 옮김"""
+        with self._conn:
+            self._conn.execute("ALTER TABLE reports RENAME TO reports_old")
+            self._conn.execute(_CREATE_REPORTS_TABLE)
+            self._conn.execute(
+                "INSERT INTO reports (id, version, created_at, payload)"
+                " SELECT id, version, created_at, payload FROM reports_old ORDER BY created_at, rowid"
+            )
+            self._conn.execute("DROP TABLE reports_old")
+
+    def put(self, report_id: str, report: Dict[str, Any]) -> str:
+        blob = serialize_report(report)
+        with self._lock:
+            # 이미 있는 ID는 지우고 새 seq로 저장 (포맷 변경 후 재계산된 리포트도 iter_since에 다시 나타남)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports (id, version, created_at, payload) VALUES (?, ?, ?, ?)",
+                (report_id, REPORT_FORMAT_VERSION, time.time(), blob)
+            )
+            self._conn.commit()
+        return report_id
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT version, payload FROM reports WHERE id = ?", (report_id,)).fetchone()
+        if not row or row[0] != REPORT_FORMAT_VERSION: return None # 구버전 포맷은 재계산
+        return deserialize_report(row[1])
+
+    def iter_since(self, after_seq: int = 0, batch_size: int = 1000) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """seq 순으로 after_seq 이후에 저장된 리포트 -> (seq, 리포트 ID, 리포트)
+        집계 쪽은 마지막 seq만 기억해 두면 새로 쌓인 리포트만 이어서 읽을 수 있음
+        (다시 저장된 리포트는 새 seq로 한 번 더 나오므로 리포트 ID로 중복 제거)"""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, id, version, payload FROM reports WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (after_seq, batch_size)
+                ).fetchall()
+            for seq, report_id, version, payload in rows:
+                after_seq = seq
+                if version != REPORT_FORMAT_VERSION: continue # 구버전은 재계산되어 새 seq로 다시 저장됨
+                yield seq, report_id, deserialize_report(payload)
+            if len(rows) < batch_size: return
+
+    def delete(self, report_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
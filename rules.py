@@ -0,0 +1,164 @@
+import operator
+from typing import Dict, Any, Callable, Iterable, List, Optional
+
+# ==========================================
+# 1. 선언형 분류 규칙 (Declarative Rules)
+# ==========================================
+# 규칙 형식 (db_data/classification_rules.json):
+#   {"id": "jaedasin_yak", "all": [조건, ...]}   # 또는 "any": [...]
+#   조건: {"var": "재성", "op": ">=", "value": 3.5}
+#         {"sum": ["비겁", "인성"], "op": "<=", "value": 3.0}   # 여러 변수의 합
+#         {"var": "day_pillar", "op": "in", "value": ["경진", ...]}
+# 변수: 오행 가중치(목/화/토/금/수/토_습/토_조), 십성 그룹(비겁/식상/재성/관성/인성), gender, day_pillar
+#
+# 컴파일된 조건은 변수 값이 스칼라면 bool, numpy 배열(열)이면 bool 배열을 돌려주므로
+# 리포트 1건 판정과 저장된 수백만 건 일괄 태깅에 같은 규칙을 그대로 씀.
+_OPERATORS = {
+    '>=': operator.ge, '>': operator.gt, '<=': operator.le, '<': operator.lt,
+    '==': operator.eq, '!=': operator.ne,
+}
+
+Predicate = Callable[[Dict[str, Any]], Any]
+
+# 일괄 태깅 시 점수 배열의 열 순서
+OHENG_COLUMNS = ['목', '화', '토', '금', '수', '토_습', '토_조']
+GROUP_COLUMNS = ['비겁', '식상', '재성', '관성', '인성']
+
+# 규칙에서 쓸 수 있는 변수 (수치 변수는 숫자, 문자열 변수는 문자열과만 비교)
+NUMERIC_VARIABLES = frozenset(OHENG_COLUMNS + GROUP_COLUMNS)
+STRING_VARIABLES = frozenset(['gender', 'day_pillar'])
+RULE_VARIABLES = NUMERIC_VARIABLES | STRING_VARIABLES
+_STRING_OPERATORS = frozenset(['==', '!=', 'in'])
+
+# 규칙 파일이 없거나 깨졌을 때 쓰는 내장 규칙 (classification_rules.json 초기값과 동일)
+DEFAULT_RULES: Dict[str, Any] = {'rules': [
+    {'id': 'gwegang', 'all': [{'var': 'day_pillar', 'op': 'in', 'value': ['경진', '임진', '무술', '경술', '무진']}]},
+    {'id': 'jaedasin_yak', 'all': [{'var': '재성', 'op': '>=', 'value': 3.5}, {'sum': ['비겁', '인성'], 'op': '<=', 'value': 3.0}]},
+    {'id': 'gwansal', 'all': [{'var': '관성', 'op': '>=', 'value': 3.0}]},
+    {'id': 'lack_inseong', 'all': [{'var': '인성', 'op': '<=', 'value': 0.5}]},
+    {'id': 'lack_siksang', 'all': [{'var': '식상', 'op': '<=', 'value': 0.5}]},
+    {'id': 'dry_hot', 'any': [{'var': '화', 'op': '>=', 'value': 3.0}, {'sum': ['화', '토_조'], 'op': '>=', 'value': 4.0}]},
+    {'id': 'cold_wet', 'any': [{'var': '수', 'op': '>=', 'value': 3.0}, {'sum': ['수', '토_습'], 'op': '>=', 'value': 4.0}]},
+    {'id': 'love_wealth_dominance_male', 'all': [
+        {'var': 'gender', 'op': '==', 'value': '남'}, {'var': '재성', 'op': '>=', 'value': 3.0},
+        {'sum': ['비겁', '인성'], 'op': '<=', 'value': 3.0}]},
+    {'id': 'love_official_mixed_female', 'all': [{'var': 'gender', 'op': '==', 'value': '여'}, {'var': '관성', 'op': '>=', 'value': 3.0}]},
+]}
+
+def _is_array(value) -> bool:
+    return hasattr(value, 'shape')
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_condition(cond: Any, allowed: Iterable[str]) -> None:
+    """조건 1개의 형식/변수/값 타입 검증 (실패 시 ValueError). 차트 평가 중에 깨지지 않도록 로드 시점에 확인"""
+    if not isinstance(cond, dict) or 'op' not in cond or 'value' not in cond or ('var' in cond) == ('sum' in cond):
+        raise ValueError(f"조건 형식 오류 (var 또는 sum 중 하나와 op, value 필요): {cond}")
+    op_name, target = cond['op'], cond['value']
+    if op_name != 'in' and op_name not in _OPERATORS:
+        raise ValueError(f"지원하지 않는 연산자: {op_name}")
+
+    names = cond['sum'] if 'sum' in cond else [cond['var']]
+    if not isinstance(names, list) or not names:
+        raise ValueError(f"sum에는 변수 이름 목록이 필요합니다: {cond}")
+    for name in names:
+        if name not in RULE_VARIABLES: raise ValueError(f"알 수 없는 변수: {name}")
+        if name not in allowed: raise ValueError(f"이 규칙에서 쓸 수 없는 변수: {name}")
+
+    is_string = names[0] in STRING_VARIABLES
+    if is_string and (len(names) > 1 or op_name not in _STRING_OPERATORS):
+        raise ValueError(f"문자열 변수 {names[0]}에는 ==, !=, in만 쓸 수 있습니다.")
+    if 'sum' in cond and any(n in STRING_VARIABLES for n in names):
+        raise ValueError(f"문자열 변수는 sum에 쓸 수 없습니다: {cond}")
+
+    values = target if op_name == 'in' else [target]
+    if op_name == 'in' and not isinstance(target, list):
+        raise ValueError(f"in 연산자의 value는 목록이어야 합니다: {cond}")
+    expected_ok = (lambda v: isinstance(v, str)) if is_string else _is_number
+    if not all(expected_ok(v) for v in values):
+        raise ValueError(f"값 타입이 변수와 맞지 않습니다: {cond}")
+
+def _compile_condition(cond: Dict[str, Any]) -> Predicate:
+    op_name, target = cond['op'], cond['value']
+
+    if 'sum' in cond:
+        names = list(cond['sum'])
+        def read(row): return sum(row[n] for n in names)
+    else:
+        name = cond['var']
+        def read(row): return row[name]
+
+    if op_name == 'in':
+        members = frozenset(target)
+        def predicate(row):
+            value = read(row)
+            if _is_array(value):
+                import numpy as np
+                return np.isin(value, list(members))
+            return value in members
+        return predicate
+
+    compare = _OPERATORS[op_name]
+    return lambda row: compare(read(row), target)
+
+def _combine(predicates: List[Predicate], use_all: bool) -> Predicate:
+    def predicate(row):
+        result = predicates[0](row)
+        for p in predicates[1:]:
+            result = (result & p(row)) if use_all else (result | p(row))
+        return result
+    return predicate
+
+def compile_rules(rule_json: Dict[str, Any], variable_scopes: Optional[Dict[str, Iterable[str]]] = None,
+                  required_ids: Optional[Iterable[str]] = None) -> Dict[str, Predicate]:
+    """규칙 JSON -> {규칙 ID: 판정 함수}. 형식/연산자/변수/값 타입 오류는 ValueError
+    variable_scopes: {규칙 ID: 쓸 수 있는 변수}. 호출 쪽이 일부 변수만 넘기는 규칙을 제한할 때 사용
+    required_ids: 반드시 있어야 하는 규칙 ID (빠지거나 이름이 바뀐 규칙은 판정이 항상 False가 되므로 거부)"""
+    rule_list = rule_json.get('rules')
+    if not isinstance(rule_list, list): raise ValueError("'rules'는 목록이어야 합니다.")
+    compiled = {}
+    for rule in rule_list:
+        rule_id = rule.get('id') if isinstance(rule, dict) else None
+        if not isinstance(rule_id, str): raise ValueError(f"규칙에 문자열 id가 필요합니다: {rule}")
+        if rule_id in compiled: raise ValueError(f"규칙 {rule_id}: id가 중복되었습니다.")
+        if 'all' in rule: conds, use_all = rule['all'], True
+        elif 'any' in rule: conds, use_all = rule['any'], False
+        else: raise ValueError(f"규칙 {rule_id}: 'all' 또는 'any'가 필요합니다.")
+        if not isinstance(conds, list) or not conds: raise ValueError(f"규칙 {rule_id}: 조건 목록이 비어 있습니다.")
+
+        allowed = RULE_VARIABLES if variable_scopes is None else frozenset(variable_scopes.get(rule_id, RULE_VARIABLES))
+        for cond in conds:
+            try:
+                _check_condition(cond, allowed)
+            except ValueError as e:
+                raise ValueError(f"규칙 {rule_id}: {e}") from None
+        compiled[rule_id] = _combine([_compile_condition(c) for c in conds], use_all)
+
+    missing = [rule_id for rule_id in (required_ids or []) if rule_id not in compiled]
+    if missing: raise ValueError(f"필수 규칙이 없습니다: {missing}")
+    return compiled
+
+# ==========================================
+# 2. 평가 (Single / Batch)
+# ==========================================
+def evaluate_rules(row: Dict[str, Any], compiled: Dict[str, Predicate], rule_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """변수 dict(스칼라 또는 numpy 열)에 규칙 적용 -> {규칙 ID: bool 또는 bool 배열}
+    rule_ids를 주면 해당 규칙만 평가 (필요한 변수만 넘겨도 됨). 규칙이 없으면 False"""
+    ids = list(compiled) if rule_ids is None else list(rule_ids)
+    return {rule_id: (compiled[rule_id](row) if rule_id in compiled else False) for rule_id in ids}
+
+def build_rule_columns(weighted=None, group_counts=None, genders=None, day_pillars=None) -> Dict[str, Any]:
+    """점수 배열 -> 규칙 평가용 열 dict (일괄 태깅용)
+    weighted: (N, 7) 배열, 열 순서 OHENG_COLUMNS / group_counts: (N, 5) 배열, 열 순서 GROUP_COLUMNS"""
+    import numpy as np
+    columns: Dict[str, Any] = {}
+    if weighted is not None:
+        weighted = np.asarray(weighted, dtype=np.float64)
+        columns.update({name: weighted[:, i] for i, name in enumerate(OHENG_COLUMNS)})
+    if group_counts is not None:
+        group_counts = np.asarray(group_counts, dtype=np.float64)
+        columns.update({name: group_counts[:, i] for i, name in enumerate(GROUP_COLUMNS)})
+    if genders is not None: columns['gender'] = np.asarray(genders)
+    if day_pillars is not None: columns['day_pillar'] = np.asarray(day_pillars)
+    return columns
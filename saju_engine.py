@@ -1,12 +1,22 @@
 import json
 import os
 import math
-import ephem
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-import pytz
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import rules
+
+# [기동 시간] ephem/geopy는 import 비용이 커서(수백 ms) 실제로 쓰는 함수 안에서 불러옴.
+# 워커/컨테이너가 새로 뜰 때마다 지불하는 비용이므로 IMPORT_TIME_BUDGET_MS로 관리함 (tests/test_import_budget.py)
+IMPORT_TIME_BUDGET_MS = 100
+
+# [계산 버전] 만세력/진시간/점수 계산 결과가 달라지는 수정을 하면 올림.
+# 리포트 ID에 포함되므로(report_store.make_report_id) 올리면 저장된 리포트는 새로 계산됨
+ENGINE_VERSION = 1
 
 # ==========================================
 # 1. 상수 및 기본 맵핑 (Constants & Maps)
@@ -14,6 +24,16 @@ from typing import Dict, Any, List, Optional, Tuple
 GAN = ["갑", "을", "병", "정", "무", "기", "경", "신", "임", "계"]
 JI = ["자", "축", "인", "묘", "진", "사", "오", "미", "신", "유", "술", "해"]
 
+# 간/지/60갑자 번호 (모든 모듈이 이 정의를 씀). 60갑자 번호 i의 간은 i % 10, 지는 i % 12
+GAN_INDEX = {gan: i for i, gan in enumerate(GAN)}
+JI_INDEX = {ji: i for i, ji in enumerate(JI)}
+GANJI_LABELS = [GAN[i % 10] + JI[i % 12] for i in range(60)]
+
+def get_ganji_index(gan_idx, ji_idx):
+    """(간 인덱스, 지 인덱스) -> 60갑자 번호 0~59. 정수와 numpy 배열 모두 가능
+    i ≡ g (mod 10), i ≡ j (mod 12)를 만족하는 i = (6g - 5j) mod 60"""
+    return (6 * gan_idx - 5 * ji_idx) % 60
+
 # V2.2: 조후 분석을 위한 토(土) 오행 분리 및 십성 매핑
 OHENG_MAP = {
     '갑': '목', '을': '목', '병': '화', '정': '화', '경': '금', '신': '금', '임': '수', '계': '수',
@@ -63,30 +83,56 @@ JIJI_INTERACTIONS = {
 # ==========================================
 # 2. 데이터베이스 로딩 및 관리
 # ==========================================
+# 요청된 모든 DB 파일 목록 [cite: 122]
+DB_FILES = {
+    'identity': 'identity_db.json', 'career': 'career_db.json', 'health': 'health_db.json',
+    'love': 'love_db.json', 'timeline': 'timeline_db.json', 'shinsal': 'shinsal_db.json',
+    'lifecycle_pillar': 'lifecycle_pillar_db.json', 'five_elements_matrix': 'five_elements_matrix.json',
+    'symptom_mapping': 'symptom_mapping.json', 'compatibility': 'compatibility_db.json',
+    'classification_rules': 'classification_rules.json'
+}
+DB_DIR = os.path.join(os.path.dirname(__file__), 'db_data') # [cite: 121]
+
+# 핫 리로드 시 최소한의 구조 검증에 쓰는 필수 최상위 키
+DB_REQUIRED_KEYS = {
+    'career': ['modern_jobs'], 'shinsal': ['basic_meanings'], 'symptom_mapping': ['symptom_map'],
+    'five_elements_matrix': ['ten_gods_interactions'], 'compatibility': ['zizhi_interactions'],
+    'timeline': ['life_stages_detailed'], 'classification_rules': ['rules'],
+}
+
+# KnowledgeBase 스냅샷에 함께 담기는 DB별 버전 정보 키 (DB 파일 키와 겹치지 않도록 밑줄 접두사)
+DB_VERSIONS_KEY = '_versions'
+
+def read_db_file(key: str, db_dir: str = DB_DIR) -> Tuple[Dict[str, Any], str]:
+    """DB 파일 1개 로드 + 검증 -> (내용, 버전). 실패 시 예외 발생 (FileNotFoundError / ValueError)
+    버전은 파일 내용의 해시라서 재시작/워커가 달라도 같은 내용이면 같은 값 (저장되는 리포트 ID에 써도 안전)"""
+    file_path = os.path.join(db_dir, DB_FILES[key])
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw.decode('utf-8')) # JSONDecodeError/UnicodeDecodeError는 ValueError의 하위 클래스
+    if not isinstance(data, dict):
+        raise ValueError(f"{DB_FILES[key]}: 최상위 구조가 객체가 아닙니다.")
+    missing = [k for k in DB_REQUIRED_KEYS.get(key, []) if k not in data]
+    if missing:
+        raise ValueError(f"{DB_FILES[key]}: 필수 키 누락 {missing}")
+    if key == 'classification_rules':
+        try:
+            rules.compile_rules(data, RULE_VARIABLE_SCOPES, REQUIRED_RULE_IDS) # 잘못된 규칙은 교체 전에 거부 (마지막 정상본 유지)
+        except ValueError as e:
+            raise ValueError(f"{DB_FILES[key]}: {e}") from None
+    return data, hashlib.sha1(raw).hexdigest()[:16]
+
+def load_db_file(key: str, db_dir: str = DB_DIR) -> Dict[str, Any]:
+    """DB 파일 1개 로드 + 검증. 실패 시 예외 발생 (FileNotFoundError / ValueError)"""
+    return read_db_file(key, db_dir)[0]
+
 def load_all_dbs() -> Dict[str, Any]:
     """db_data 폴더에서 모든 JSON 파일을 로드"""
     db = {}
-    # 요청된 모든 DB 파일 목록 [cite: 122]
-    db_files = {
-        'identity': 'identity_db.json', 'career': 'career_db.json', 'health': 'health_db.json',
-        'love': 'love_db.json', 'timeline': 'timeline_db.json', 'shinsal': 'shinsal_db.json',
-        'lifecycle_pillar': 'lifecycle_pillar_db.json', 'five_elements_matrix': 'five_elements_matrix.json',
-        'symptom_mapping': 'symptom_mapping.json', 'compatibility': 'compatibility_db.json'
-    }
-    
-    current_dir = os.path.dirname(__file__)
-    db_dir = os.path.join(current_dir, 'db_data') # [cite: 121]
-    
-    if not os.path.exists(db_dir):
-        # os.makedirs(db_dir) # 필요시 사용
-        pass
-
-    for key, filename in db_files.items():
-        file_path = os.path.join(db_dir, filename)
+    for key, filename in DB_FILES.items():
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                db[key] = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            db[key] = load_db_file(key)
+        except (FileNotFoundError, ValueError):
             db[key] = {} # 파일이 없거나 깨졌을 때 빈 딕셔너리 할당
             print(f"Warning: Failed to load {filename}")
 
@@ -121,6 +167,7 @@ def get_ganji_from_jdn(jdn):
     return GAN[gan_idx], JI[ji_idx]
 
 def get_solar_term_month(dt: datetime) -> Tuple[str, int]:
+    import ephem
     sun = ephem.Sun()
     date_ephem = ephem.Date(dt)
     sun.compute(date_ephem)
@@ -132,27 +179,44 @@ def get_solar_term_month(dt: datetime) -> Tuple[str, int]:
     month_ji_char = JI[(2 + month_idx) % 12]
     return month_ji_char, month_idx
 
-def get_true_local_time(dt: datetime, city_name: str) -> datetime:
+def resolve_birth_dt(user_data: Dict[str, Any]) -> datetime:
+    """입력 생년월일시 -> 양력 datetime
+    음력은 2월 30일처럼 양력 datetime으로 담을 수 없는 날이 있으므로 birth_dt 대신
+    lunar_date=(연, 월, 일, 윤달 여부) + birth_time(시각)으로 받아 음력 변환표로 환산 (없는 날짜면 ValueError)"""
+    if 'lunar_date' in user_data:
+        import lunar_calendar
+        solar = lunar_calendar.lunar_to_solar(*user_data['lunar_date'])
+        return datetime.combine(solar, user_data.get('birth_time', datetime.min.time()))
+    if user_data.get('is_lunar'):
+        raise ValueError("음력 생일은 birth_dt가 아니라 lunar_date=(연, 월, 일, 윤달 여부)로 넘겨야 합니다.")
+    return user_data['birth_dt']
+
+@functools.lru_cache(maxsize=1024)
+def get_city_longitude(city_name: str) -> float:
+    """도시 경도 조회 (도시별 1회만 지오코딩, 실패는 캐시하지 않음)"""
+    from geopy.geocoders import Nominatim
+    geolocator = Nominatim(user_agent="Shinryeong_App")
+    location = geolocator.geocode(city_name)
+    
+    if not location:
+        location = geolocator.geocode("Seoul") # fallback
+    return location.longitude
+
+def get_true_local_time(dt: datetime, city_name: str) -> Tuple[datetime, bool]:
+    """표준시 -> 진태양시. (시간, 보정 여부)를 반환하며 지오코딩 실패 시 (입력 시간, False)"""
     try:
-        geolocator = Nominatim(user_agent="Shinryeong_App")
-        location = geolocator.geocode(city_name)
-        
-        if not location:
-            city_name = "Seoul" # fallback
-            location = geolocator.geocode(city_name)
-
-        longitude = location.longitude
-        STANDARD_MERIDIAN = 135
-        longitude_diff_min = (longitude - STANDARD_MERIDIAN) * 4
-        true_local_time = dt - timedelta(minutes=longitude_diff_min)
-        return true_local_time
+        longitude = get_city_longitude(city_name)
     except Exception:
-        return dt # 에러 시 입력 시간 그대로 사용
+        return dt, False # 에러 시 입력 시간 그대로 사용 (호출 측에서 저장/캐시하지 않도록 표시)
+    STANDARD_MERIDIAN = 135
+    longitude_diff_min = (longitude - STANDARD_MERIDIAN) * 4
+    return dt - timedelta(minutes=longitude_diff_min), True
 
 def calculate_saju_pillars(dt: datetime) -> Dict[str, str]:
     jdn = get_julian_day_number(dt.year, dt.month, dt.day)
     day_gan, day_ji = get_ganji_from_jdn(jdn)
     
+    import ephem
     sun = ephem.Sun()
     sun.compute(ephem.Date(dt))
     lon = math.degrees(sun.hlon)
@@ -237,6 +301,116 @@ def calculate_five_elements(saju_pillars: Dict[str, str]) -> Dict[str, Any]:
 
     return {"visual": visual_counts, "weighted": weighted_counts}
 
+# [점수 인코딩] 명식 테이블(pillar_table)과 리포트 저장소(report_store)가 같은 정수 표현을 씀
+#   오행 개수(6) + 오행 가중치 x4(6) + 십성 raw 점수 x4(10) = 정수 22개. 점수는 모두 0.25 단위
+#   '토'(= 토_습 + 토_조)와 그룹 점수(= raw 점수의 합)는 저장하지 않고 복원
+SCORE_OHENG_KEYS = ['목', '화', '금', '수', '토_습', '토_조']
+SCORE_SIBSEONG_KEYS = list(SIBSEONG_GROUP_MAP.keys())
+SCORE_SCALE = 4 # 0.25점 단위
+SCORE_VALUE_COUNT = 2 * len(SCORE_OHENG_KEYS) + len(SCORE_SIBSEONG_KEYS)
+
+def encode_chart_scores(oheng_counts: Dict[str, Any], sibseong_data: Dict[str, Any]) -> List[int]:
+    """calculate_chart_scores 결과 -> 정수 22개"""
+    return (
+        [int(oheng_counts['visual'][k]) for k in SCORE_OHENG_KEYS]
+        + [int(round(oheng_counts['weighted'][k] * SCORE_SCALE)) for k in SCORE_OHENG_KEYS]
+        + [int(round(sibseong_data['raw_counts'][k] * SCORE_SCALE)) for k in SCORE_SIBSEONG_KEYS]
+    )
+
+def decode_chart_scores(values: Sequence[int]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """정수 22개 -> calculate_five_elements / calculate_sibseong_counts와 같은 구조"""
+    n = len(SCORE_OHENG_KEYS)
+    visual = {k: v for k, v in zip(SCORE_OHENG_KEYS, values[:n])}
+    weighted = {k: v / SCORE_SCALE for k, v in zip(SCORE_OHENG_KEYS, values[n:2 * n])}
+    visual['토'] = visual['토_습'] + visual['토_조']
+    weighted['토'] = weighted['토_습'] + weighted['토_조']
+
+    raw_counts = {k: v / SCORE_SCALE for k, v in zip(SCORE_SIBSEONG_KEYS, values[2 * n:SCORE_VALUE_COUNT])}
+    group_counts = {'비겁': 0.0, '식상': 0.0, '재성': 0.0, '관성': 0.0, '인성': 0.0}
+    for sib, group in SIBSEONG_GROUP_MAP.items():
+        group_counts[group] += raw_counts[sib]
+    return {'visual': visual, 'weighted': weighted}, {'raw_counts': raw_counts, 'group_counts': group_counts}
+
+def calculate_chart_scores(saju_pillars: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """오행/십성 점수. 빌드된 명식 테이블(pillar_table.py)이 있으면 행 1개 조회로 대체"""
+    import pillar_table # 순환 import 방지 (pillar_table이 이 모듈을 참조)
+    table = pillar_table.get_default_table()
+    if table is not None:
+        return table.lookup(saju_pillars)
+    return calculate_five_elements(saju_pillars), calculate_sibseong_counts(saju_pillars['day_gan'], saju_pillars)
+
+# 서사 선택 플래그 = db_data/classification_rules.json의 규칙 ID
+RISK_FLAG_IDS = ['gwegang', 'jaedasin_yak', 'gwansal', 'lack_inseong', 'lack_siksang']
+HEALTH_FLAG_IDS = ['dry_hot', 'cold_wet']
+LOVE_FLAG_IDS = ['love_wealth_dominance_male', 'love_official_mixed_female']
+
+# 판정 함수마다 넘기는 변수가 다르고, 섹션 캐시 키(REPORT_SECTIONS)도 그 변수들로만 만들어지므로
+# 규칙이 쓸 수 있는 변수를 같은 범위로 제한 (그 밖의 규칙 ID는 일괄 태깅용이라 전체 변수 허용)
+_HEALTH_VARIABLES = rules.OHENG_COLUMNS
+_RISK_VARIABLES = rules.GROUP_COLUMNS + ['day_pillar']
+_LOVE_VARIABLES = rules.GROUP_COLUMNS + ['gender']
+RULE_VARIABLE_SCOPES = {
+    **{rule_id: _HEALTH_VARIABLES for rule_id in HEALTH_FLAG_IDS},
+    **{rule_id: _RISK_VARIABLES for rule_id in RISK_FLAG_IDS},
+    **{rule_id: _LOVE_VARIABLES for rule_id in LOVE_FLAG_IDS},
+}
+# 서사 선택에 쓰는 규칙은 규칙 파일에 반드시 있어야 함 (없으면 파일 전체를 거부하고 마지막 정상본/내장 규칙 사용)
+REQUIRED_RULE_IDS = RISK_FLAG_IDS + HEALTH_FLAG_IDS + LOVE_FLAG_IDS
+
+_default_rule_json: Optional[Dict[str, Any]] = None
+_compiled_rule_cache: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+def get_rule_table(db: Optional[Dict] = None) -> Dict[str, Any]:
+    """컴파일된 분류 규칙. db 스냅샷에 규칙이 있으면 그것을(핫 리로드 반영), 없으면 기본 규칙 파일을 사용
+    규칙 파일이 없거나 깨졌으면 내장 규칙(rules.DEFAULT_RULES)으로 대체하여 리포트 생성은 멈추지 않음"""
+    global _default_rule_json
+    rule_json = (db or {}).get('classification_rules')
+    if not rule_json:
+        if _default_rule_json is None:
+            try:
+                _default_rule_json = load_db_file('classification_rules')
+            except (FileNotFoundError, ValueError) as e:
+                print(f"Warning: Using built-in classification rules: {e}")
+                _default_rule_json = rules.DEFAULT_RULES
+        rule_json = _default_rule_json
+
+    cached = _compiled_rule_cache.get(id(rule_json))
+    if cached is None or cached[0] is not rule_json:
+        if len(_compiled_rule_cache) > 8: _compiled_rule_cache.clear() # 리로드로 쌓인 옛 버전 정리
+        cached = (rule_json, rules.compile_rules(rule_json, RULE_VARIABLE_SCOPES, REQUIRED_RULE_IDS))
+        _compiled_rule_cache[id(rule_json)] = cached
+    return cached[1]
+
+def get_rule_variables(saju_pillars=None, oheng_counts=None, sibseong_data=None) -> Dict[str, Any]:
+    """규칙 평가용 변수 dict (오행 가중치 + 십성 그룹 + 일주)"""
+    row: Dict[str, Any] = {}
+    if oheng_counts is not None: row.update(oheng_counts['weighted'])
+    if sibseong_data is not None: row.update(sibseong_data['group_counts'])
+    if saju_pillars is not None: row['day_pillar'] = saju_pillars['day_gan'] + saju_pillars['day_ji']
+    return row
+
+def _evaluate_flags(row: Dict[str, Any], rule_ids: List[str], rule_table: Optional[Dict[str, Any]]) -> Dict[str, bool]:
+    if rule_table is None: rule_table = get_rule_table()
+    return {k: bool(v) for k, v in rules.evaluate_rules(row, rule_table, rule_ids).items()}
+
+def calculate_health_flags(oheng_counts: Dict[str, Any], rule_table: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+    """조후(건강) 판정 플래그: 조열(Dry_Hot) / 한습(Cold_Wet)"""
+    return _evaluate_flags(get_rule_variables(oheng_counts=oheng_counts), HEALTH_FLAG_IDS, rule_table)
+
+def calculate_risk_flags(saju_pillars: Dict[str, str], sibseong_data: Dict[str, Any], rule_table: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+    """특수 리스크 판정 플래그: 괴강 / 재다신약 / 관살혼잡 / 인성·식상 결핍"""
+    return _evaluate_flags(get_rule_variables(saju_pillars=saju_pillars, sibseong_data=sibseong_data), RISK_FLAG_IDS, rule_table)
+
+def calculate_love_flags(sibseong_data: Dict[str, Any], gender: Optional[str], rule_table: Optional[Dict[str, Any]] = None) -> Dict[str, bool]:
+    """연애 심리 패턴 플래그: 재다신약 남성 / 관살혼잡 여성"""
+    row = get_rule_variables(sibseong_data=sibseong_data)
+    row['gender'] = gender
+    return _evaluate_flags(row, LOVE_FLAG_IDS, rule_table)
+
+def tag_charts(columns: Dict[str, Any], db: Optional[Dict] = None, rule_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """저장된 차트 점수 열(rules.build_rule_columns)에 규칙을 일괄 적용 -> {규칙 ID: bool 배열}"""
+    return rules.evaluate_rules(columns, get_rule_table(db), rule_ids)
+
 # ==========================================
 # 5. 스토리텔링 생성기 (Narrative) - Full Logic
 # ==========================================
@@ -279,14 +453,8 @@ def generate_identity_analysis(saju_pillars, db):
     return story
 
 def generate_health_diagnosis(oheng_counts, saju_pillars, db):
-    target = oheng_counts['weighted']
-    fire_score = target.get('화', 0)
-    dry_earth = target.get('토_조', 0)
-    water_score = target.get('수', 0)
-    wet_earth = target.get('토_습', 0)
-
-    is_dry_hot = (fire_score >= 3.0) or (fire_score + dry_earth >= 4.0)
-    is_cold_wet = (water_score >= 3.0) or (water_score + wet_earth >= 4.0)
+    flags = calculate_health_flags(oheng_counts, get_rule_table(db))
+    is_dry_hot, is_cold_wet = flags['dry_hot'], flags['cold_wet']
                   
     diag_key = ""
     if is_dry_hot: diag_key = "Dry_Hot_Chart"
@@ -311,15 +479,8 @@ def generate_health_diagnosis(oheng_counts, saju_pillars, db):
     return story
 
 def generate_special_risks(saju_pillars, sibseong_data, db):
-    day_ganji = saju_pillars['day_gan'] + saju_pillars['day_ji']
-    is_gwegang = day_ganji in ['경진', '임진', '무술', '경술', '무진']
-    
-    # [V2.5 업데이트] 재다신약 로직 강화 [cite: 8, 25, 29]
-    jaeseong_count = sibseong_data['group_counts'].get('재성', 0)
-    self_strength = sibseong_data['group_counts'].get('비겁', 0) + sibseong_data['group_counts'].get('인성', 0)
-    is_jaedasin_yak = (jaeseong_count >= 3.5) and (self_strength <= 3.0)
-    
-    is_gwansal = sibseong_data['group_counts'].get('관성', 0) >= 3.0
+    flags = calculate_risk_flags(saju_pillars, sibseong_data, get_rule_table(db))
+    is_gwegang, is_jaedasin_yak, is_gwansal = flags['gwegang'], flags['jaedasin_yak'], flags['gwansal']
 
     results = []
     
@@ -349,9 +510,10 @@ def generate_special_risks(saju_pillars, sibseong_data, db):
         if isinstance(data, dict):
             results.append({'title': "나를 억누르는 **관살혼잡**", 'content': f"**{data.get('effect_ko')}**\n**신령의 처방:** {data.get('remedy_advice')}\n*신령의 일침:* {data.get('shamanic_voice')}"})
 
-    lacks = {'인성': sibseong_data['group_counts'].get('인성', 0), '식상': sibseong_data['group_counts'].get('식상', 0)}
-    for sib_name, count in lacks.items():
-        if count <= 0.5:
+    lacks = {'인성': 'lack_inseong', '식상': 'lack_siksang'}
+    for sib_name, flag in lacks.items():
+        count = sibseong_data['group_counts'].get(sib_name, 0)
+        if flags[flag]:
             risk_desc = "정신적 지지 부족" if sib_name == '인성' else "표현력 부족"
             results.append({'title': f"**{sib_name}** 결핍 ({count}점)", 'content': f"{sib_name}이 부족하여 **{risk_desc}**을 겪을 수 있네. 인성과 식상을 보완하는 노력이 필요하네."})
 
@@ -373,21 +535,18 @@ def generate_career_analysis(sibseong_data, db):
     return story
 
 def generate_love_psychology(sibseong_data, user_data, db):
-    gender = user_data.get('gender')
-    jaeseong_count = sibseong_data['group_counts'].get('재성', 0)
-    self_strength = sibseong_data['group_counts'].get('비겁', 0) + sibseong_data['group_counts'].get('인성', 0)
-    gwansal_count = sibseong_data['group_counts'].get('관성', 0)
+    flags = calculate_love_flags(sibseong_data, user_data.get('gender'), get_rule_table(db))
     
     story = "그대의 연애 심리는 사주 원국에 깊이 뿌리내리고 있네. "
     
-    if gender == '남' and jaeseong_count >= 3.0 and self_strength <= 3.0:
+    if flags['love_wealth_dominance_male']:
         data = get_db_content(db, 'love', 'conflict_triggers', 'wealth_dominance_male')
         if isinstance(data, dict):
             story += f"남성 사주에 재성(여자/돈)은 강하고 신약하니 **재다신약 남성**의 심리가 강하네. "
             story += f"자네는 {data.get('partner_context')}에 휘둘리기 쉽네. "
             story += f"**갈등 원인:** {data.get('fight_reason', '우유부단함')}. "
             story += f"\n\n**신령의 한마디:** \"{data.get('shamanic_voice')}\""
-    elif gender == '여' and gwansal_count >= 3.0:
+    elif flags['love_official_mixed_female']:
         data = get_db_content(db, 'love', 'conflict_triggers', 'official_killing_mixed_female')
         if isinstance(data, dict):
             story += f"**관살혼잡 여성**의 패턴이네. {data.get('desc')} "
@@ -397,25 +556,33 @@ def generate_love_psychology(sibseong_data, user_data, db):
     return story
 
 def generate_shinsal_analysis(saju_pillars, db):
-    shinsal_list = []
-    jis = [saju_pillars['year_ji'], saju_pillars['month_ji'], saju_pillars['day_ji'], saju_pillars['time_ji']]
-    
-    if any(ji in ['자', '묘', '오', '유'] for ji in jis): shinsal_list.append('도화살(Peach_Blossom)')
-    if any(ji in ['인', '신', '사', '해'] for ji in jis): shinsal_list.append('역마살(Stationary_Horse)')
-    if any(ji in ['진', '술', '축', '미'] for ji in jis): shinsal_list.append('화개살(Art_Cover)')
+    import shinsal # 순환 import 방지 (shinsal이 이 모듈의 상수를 참조)
+    found = shinsal.evaluate_shinsal(saju_pillars)
     
     story = "자네 사주에는 다음의 **특수 신살(神殺)**이 깃들어 있네."
     
-    if not shinsal_list: return story + " 특별한 살성은 없으니 평이하나, 큰 재주도 큰 리스크도 없는 무난한 운명이네."
+    if not found: return story + " 특별한 살성은 없으니 평이하나, 큰 재주도 큰 리스크도 없는 무난한 운명이네."
     
-    for shinsal_key in set(shinsal_list):
+    for shinsal_key, positions in found.items():
         data = get_db_content(db, 'shinsal', 'basic_meanings', shinsal_key)
         if isinstance(data, dict):
-            story += f"\n\n**{shinsal_key.split('(')[0]}**"
+            position_str = ', '.join(shinsal.POSITION_LABELS[p] for p in positions)
+            story += f"\n\n**{shinsal_key.split('(')[0]}** ({position_str})"
             story += f"\n- **설명:** {data.get('desc', '정보없음')}"
             story += f"\n- **긍정 발현:** {data.get('positive', '정보없음')}"
             story += f"\n- **부정 발현:** {data.get('negative', '없음')}"
 
+    # 신살끼리 겹칠 때의 복합 작용
+    combos = []
+    noble = set(found.get('천을귀인(Noble_Helper)', []))
+    if noble & set(found.get('공망(Void)', [])): combos.append('귀인_공망_조합')
+    if '귀문관살(Ghost_Gate)' in found and '원진살(Resentment)' in found: combos.append('귀문_원진_조합')
+    for combo_key in combos:
+        data = get_db_content(db, 'shinsal', 'complex_interactions', combo_key)
+        if isinstance(data, dict):
+            story += f"\n\n**⚠️ 복합 작용: {combo_key.replace('_조합', '').replace('_', '+')}**"
+            story += f"\n{data.get('result', '')}\n*신령의 일침:* \"{data.get('shamanic_voice', '')}\""
+
     story += "\n\n이러한 살성들은 잘 쓰면 자네의 **특별한 재능**이 되지만, 잘못 쓰면 **평생의 걸림돌**이 되니 늘 마음을 다스려야 하네."
     return story
 
@@ -486,38 +653,129 @@ def generate_lifecycle_analysis(saju_pillars, sibseong_data, db):
 # ==========================================
 # 6. 메인 프로세서 (Main Processor)
 # ==========================================
-def process_saju_input(user_data: Dict[str, Any], db: Dict) -> Dict[str, Any]:
-    true_dt = get_true_local_time(user_data['birth_dt'], user_data['city'])
-    saju_pillars = calculate_saju_pillars(true_dt)
-    oheng_counts = calculate_five_elements(saju_pillars)
-    sibseong_data = calculate_sibseong_counts(saju_pillars['day_gan'], saju_pillars)
-    
-    analytics_data = []
-    # 9가지 필수 항목 준수 [cite: 9, 212]
-    analytics_data.append({"type": "INTRO", "title": "🔮 타고난 에너지 요약", "content": generate_intro_summary(saju_pillars, oheng_counts, sibseong_data, db)})
-    analytics_data.append({"type": "IDENTITY", "title": "👤 일주(日柱) 기질 분석", "content": generate_identity_analysis(saju_pillars, db)})
-    analytics_data.append({"type": "HEALTH", "title": "☔ 환경 및 건강 진단", "content": generate_health_diagnosis(oheng_counts, saju_pillars, db)})
-    
+def generate_special_risks_summary(saju_pillars, sibseong_data, db):
     risks = generate_special_risks(saju_pillars, sibseong_data, db)
-    if risks:
-        content = "\n\n".join([f"**{r['title']}**\n{r['content']}" for r in risks])
-        analytics_data.append({"type": "SPECIAL", "title": "⚔️ 특수 살성 및 리스크", "content": content})
-        
-    analytics_data.append({"type": "CAREER", "title": "💼 직업 및 적성", "content": generate_career_analysis(sibseong_data, db)})
-    analytics_data.append({"type": "LOVE", "title": "💖 이성/연애 심리", "content": generate_love_psychology(sibseong_data, user_data, db)})
-    analytics_data.append({"type": "SHINSAL", "title": "✨ 특수 신살", "content": generate_shinsal_analysis(saju_pillars, db)})
-    analytics_data.append({"type": "FORTUNE", "title": "⚡️ 2025년 세운", "content": generate_yearly_fortune(saju_pillars, db)})
-    analytics_data.append({"type": "LIFECYCLE", "title": "🕰️ 라이프사이클", "content": generate_lifecycle_analysis(saju_pillars, sibseong_data, db)})
-    
+    return "\n\n".join([f"**{r['title']}**\n{r['content']}" for r in risks])
+
+REPORT_DISCLAIMER = "[Disclaimer]\n본 분석은 명리학적 통계 데이터에 기반한 정보 제공 목적이며, 의학적 진단이나 법률적 확정 판결이 아닙니다. 중요한 결정은 전문가와 상의하십시오."
+
+def _group_key(ctx):
+    return tuple(sorted(ctx['sibseong_data']['group_counts'].items()))
+
+def _pillar_key(ctx, *keys):
+    return tuple(ctx['saju'][k] for k in keys)
+
+# 리포트 섹션 테이블: (타입, 제목, 렌더러, 캐시 키, 참조 DB)
+# 캐시 키는 해당 섹션 문장이 실제로 의존하는 값만 담음 -> 같은 일주/점수 패턴이면 문장을 공유
+# 9가지 필수 항목 준수 [cite: 9, 212]
+REPORT_SECTIONS = [
+    ("INTRO", "🔮 타고난 에너지 요약",
+     lambda c, db: generate_intro_summary(c['saju'], c['oheng_counts'], c['sibseong_data'], db),
+     lambda c: _pillar_key(c, 'day_gan', 'day_ji') + tuple(sorted(c['oheng_counts']['weighted'].items())) + _group_key(c),
+     ('identity',)),
+    ("IDENTITY", "👤 일주(日柱) 기질 분석",
+     lambda c, db: generate_identity_analysis(c['saju'], db),
+     lambda c: _pillar_key(c, 'day_gan', 'day_ji'),
+     ('identity',)),
+    ("HEALTH", "☔ 환경 및 건강 진단",
+     lambda c, db: generate_health_diagnosis(c['oheng_counts'], c['saju'], db),
+     lambda c: tuple(sorted(c['oheng_counts']['weighted'].items())),
+     ('symptom_mapping', 'health', 'classification_rules')),
+    ("SPECIAL", "⚔️ 특수 살성 및 리스크",
+     lambda c, db: generate_special_risks_summary(c['saju'], c['sibseong_data'], db),
+     lambda c: _pillar_key(c, 'day_gan', 'day_ji') + _group_key(c),
+     ('five_elements_matrix', 'classification_rules')),
+    ("CAREER", "💼 직업 및 적성",
+     lambda c, db: generate_career_analysis(c['sibseong_data'], db),
+     _group_key,
+     ('career',)),
+    ("LOVE", "💖 이성/연애 심리",
+     lambda c, db: generate_love_psychology(c['sibseong_data'], c['user'], db),
+     lambda c: (c['user'].get('gender'),) + _group_key(c),
+     ('love', 'classification_rules')),
+    ("SHINSAL", "✨ 특수 신살",
+     lambda c, db: generate_shinsal_analysis(c['saju'], db),
+     lambda c: _pillar_key(c, 'day_gan', 'year_ji', 'month_ji', 'day_ji', 'time_ji'),
+     ('shinsal',)),
+    ("FORTUNE", "⚡️ 2025년 세운",
+     lambda c, db: generate_yearly_fortune(c['saju'], db),
+     lambda c: _pillar_key(c, 'day_gan'),
+     ('timeline', 'compatibility')),
+    ("LIFECYCLE", "🕰️ 라이프사이클",
+     lambda c, db: generate_lifecycle_analysis(c['saju'], c['sibseong_data'], db),
+     lambda c: _pillar_key(c, 'day_gan', 'year_gan', 'month_gan', 'time_gan'),
+     ('timeline', 'lifecycle_pillar')),
     # Disclaimer 추가 [cite: 92]
-    disclaimer = "[Disclaimer]\n본 분석은 명리학적 통계 데이터에 기반한 정보 제공 목적이며, 의학적 진단이나 법률적 확정 판결이 아닙니다. 중요한 결정은 전문가와 상의하십시오."
-    analytics_data.append({"type": "DISCLAIMER", "title": "⚠️ 면책 조항", "content": disclaimer})
+    ("DISCLAIMER", "⚠️ 면책 조항",
+     lambda c, db: REPORT_DISCLAIMER,
+     lambda c: (),
+     ()),
+]
+REPORT_SECTION_INDEX = {section[0]: section for section in REPORT_SECTIONS}
+
+# 섹션 문장 캐시: 프로세스당 한 번만 생성하고 모든 리포트가 공유 (LRU 상한)
+SECTION_TEXT_CACHE_SIZE = 4096
+_section_text_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+_section_cache_lock = threading.Lock()
+
+def get_db_versions(db: Dict, *keys: str) -> Tuple:
+    """스냅샷에 담긴 DB별 내용 버전. 리포트를 만든 바로 그 스냅샷에서 읽어야 버전과 내용이 어긋나지 않음"""
+    versions = db.get(DB_VERSIONS_KEY) or {}
+    return tuple(versions.get(k) for k in keys)
+
+def get_db_cache_token(db: Dict, keys: Tuple[str, ...]) -> Tuple:
+    """섹션이 참조하는 DB들의 버전 (해당 DB가 바뀐 섹션만 캐시 미스)
+    버전 정보가 없는 DB(load_all_dbs 결과)는 인스턴스 식별자로 대체"""
+    versions = db.get(DB_VERSIONS_KEY)
+    if versions is None: return (id(db),)
+    return get_db_versions(db, *keys)
+
+def render_section(section_type: str, ctx: Dict[str, Any], db: Dict) -> str:
+    """섹션 참조 1개를 문장으로 확장 (캐시 우선)"""
+    _, _, render, key_fn, db_keys = REPORT_SECTION_INDEX[section_type]
+    cache_key = (section_type, get_db_cache_token(db, db_keys), key_fn(ctx))
+    with _section_cache_lock:
+        text = _section_text_cache.get(cache_key)
+        if text is not None:
+            _section_text_cache.move_to_end(cache_key)
+            return text
+    text = render(ctx, db)
+    with _section_cache_lock:
+        _section_text_cache[cache_key] = text
+        if len(_section_text_cache) > SECTION_TEXT_CACHE_SIZE:
+            _section_text_cache.popitem(last=False)
+    return text
+
+def render_report_sections(report: Dict[str, Any], db: Dict) -> List[Dict[str, str]]:
+    """섹션 참조 목록(report['sections']) -> 분석 카드 목록"""
+    analytics_data = []
+    for section_type in report.get('sections', []):
+        content = render_section(section_type, report, db)
+        if not content: continue # 해당 사항 없는 섹션(예: 리스크 없음)은 생략
+        title = REPORT_SECTION_INDEX[section_type][1]
+        analytics_data.append({"type": section_type, "title": title, "content": content})
+    return analytics_data
+
+def expand_report(report: Dict[str, Any], db: Dict) -> Dict[str, Any]:
+    """참조형 리포트를 전체 문장이 포함된 리포트로 확장"""
+    if 'analytics' in report: return report
+    expanded = {k: v for k, v in report.items() if k != 'sections'}
+    expanded['analytics'] = render_report_sections(report, db)
+    return expanded
+
+def process_saju_input(user_data: Dict[str, Any], db: Dict, as_refs: bool = False) -> Dict[str, Any]:
+    """사주 리포트 생성. as_refs=True면 문장 대신 섹션 참조만 담아 반환 (expand_report로 확장)"""
+    true_dt, corrected = get_true_local_time(resolve_birth_dt(user_data), user_data['city'])
+    saju_pillars = calculate_saju_pillars(true_dt)
+    oheng_counts, sibseong_data = calculate_chart_scores(saju_pillars)
 
-    return {
-        "user": user_data, "true_dt": true_dt, "saju": saju_pillars,
+    report = {
+        "user": user_data, "true_dt": true_dt, "true_dt_corrected": corrected, "saju": saju_pillars,
         "oheng_counts": oheng_counts, "sibseong_data": sibseong_data,
-        "analytics": analytics_data
+        "sections": [section[0] for section in REPORT_SECTIONS]
     }
+    if as_refs: return report
+    return expand_report(report, db)
 
 def get_zizhi_interaction_data(ji1: str, ji2: str, db: Dict) -> Tuple[Optional[str], Optional[Dict]]:
     pair = tuple(sorted([ji1, ji2]))
@@ -533,14 +791,22 @@ def get_zizhi_interaction_data(ji1: str, ji2: str, db: Dict) -> Tuple[Optional[s
     if isinstance(data, dict): return interaction_key, data
     return None, None
 
+def get_zizhi_adjustment(ji_a: str, ji_b: str, db: Dict) -> Tuple[Optional[str], Optional[Dict], int]:
+    """일지 상호작용에 따른 궁합 가감점 (합은 가점, 충/형은 감점)"""
+    ikey, idata = get_zizhi_interaction_data(ji_a, ji_b, db)
+    if not (ikey and idata): return None, None, 0
+    is_clash = '충' in ikey or '형' in ikey
+    score_change = -idata.get('score_deduction', 0) if is_clash else idata.get('score_bonus', 0)
+    return ikey, idata, score_change
+
 def check_ding_ren_harmony(saju_a, saju_b):
     gan_list = [saju_a['year_gan'], saju_a['month_gan'], saju_a['day_gan'], saju_a['time_gan'],
                 saju_b['year_gan'], saju_b['month_gan'], saju_b['day_gan'], saju_b['time_gan']]
     return '정' in gan_list and '임' in gan_list
 
 def process_love_compatibility(user_a, user_b, db):
-    true_dt_a = get_true_local_time(user_a['birth_dt'], user_a.get('city', 'Seoul'))
-    true_dt_b = get_true_local_time(user_b['birth_dt'], user_b.get('city', 'Seoul'))
+    true_dt_a, corrected_a = get_true_local_time(resolve_birth_dt(user_a), user_a.get('city', 'Seoul'))
+    true_dt_b, corrected_b = get_true_local_time(resolve_birth_dt(user_b), user_b.get('city', 'Seoul'))
     saju_a = calculate_saju_pillars(true_dt_a)
     saju_b = calculate_saju_pillars(true_dt_b)
     
@@ -556,10 +822,8 @@ def process_love_compatibility(user_a, user_b, db):
     zizhi_analysis = []
     
     # [V2.5 업데이트] 지지 상호작용 및 점수 반영 로직 [cite: 39, 44]
-    ikey, idata = get_zizhi_interaction_data(ji_a, ji_b, db)
+    ikey, idata, score_change = get_zizhi_adjustment(ji_a, ji_b, db)
     if ikey and idata:
-        is_clash = '충' in ikey or '형' in ikey
-        score_change = -idata.get('score_deduction', 0) if is_clash else idata.get('score_bonus', 0)
         adjustment += score_change
         # 점수 영향 분석 텍스트 생성 [cite: 54]
         zizhi_analysis.append(f"**일지 {ikey}**: {idata.get('ko_desc')} (**점수 영향:** {score_change}점)")
@@ -602,5 +866,58 @@ def process_love_compatibility(user_a, user_b, db):
     return {
         "user_a": {"user": user_a, "saju": saju_a, "oheng_counts": calculate_five_elements(saju_a)},
         "user_b": {"user": user_b, "saju": saju_b, "oheng_counts": calculate_five_elements(saju_b)},
-        "analytics": analytics
+        "analytics": analytics,
+        "true_dt_corrected": corrected_a and corrected_b
     }
+
+# ==========================================
+# 7. 챗봇 응답 인덱스 (Chat Intent Index)
+# ==========================================
+# 질문 키워드 -> 리포트 카드 타입. 리포트 생성 시 한 번 색인해두고 질문마다 조회만 함
+CHAT_INTENT_KEYWORDS = {
+    'CAREER': ['돈', '재물', '재산', '직업', '적성', '회사', '사업', '취업', '이직', '커리어', '업무'],
+    'LOVE': ['연애', '결혼', '사랑', '이성', '배우자', '여자', '남자', '애인', '썸'],
+    'HEALTH': ['건강', '몸', '질병', '병원', '아프', '수면', '스트레스'],
+    'SPECIAL': ['조심', '주의', '위험', '리스크', '괴강', '재다신약', '관살'],
+    'SHINSAL': ['신살', '도화', '역마', '화개', '양인', '귀문'],
+    'FORTUNE': ['올해', '내년', '2025', '2026', '세운', '운세'],
+    'LIFECYCLE': ['초년', '청년', '중년', '말년', '노후', '인생'],
+    'IDENTITY': ['성격', '기질', '자아', '일주'],
+    'INTRO': ['오행', '기운', '에너지', '요약'],
+    'RESULT': ['궁합', '점수', '인연'],
+    'INTERACTION': ['충돌', '다툼', '지지', '상호작용'],
+    'TEMPERATURE': ['조후', '온도', '보완'],
+    'PSYCHOLOGY': ['정임합', '심리'],
+}
+
+CHAT_FALLBACK_RESPONSE = "허허, 천기누설은 함부로 하는 게 아니네. 하지만 자네의 운세는 자네 마음먹기에 달렸다는 걸 잊지 말게."
+
+def build_chat_index(analytics: List[Dict[str, str]]) -> Dict[str, List[int]]:
+    """리포트 카드들에 대한 키워드 역색인 생성 (키워드 -> 카드 인덱스 목록)"""
+    index: Dict[str, List[int]] = {}
+    for i, item in enumerate(analytics):
+        for keyword in CHAT_INTENT_KEYWORDS.get(item.get('type'), []):
+            index.setdefault(keyword, []).append(i)
+    return index
+
+def summarize_section(content: str, max_len: int = 300) -> str:
+    """카드 본문에서 채팅용 핵심 문단만 추출"""
+    paragraph = content.strip().split("\n\n")[0]
+    if len(paragraph) > max_len:
+        paragraph = paragraph[:max_len].rstrip() + "..."
+    return paragraph
+
+def answer_chat_question(prompt: str, analytics: List[Dict[str, str]], index: Optional[Dict[str, List[int]]] = None) -> str:
+    """질문 키워드와 가장 많이 겹치는 카드의 본문으로 답변 생성"""
+    if index is None: index = build_chat_index(analytics)
+
+    hits: Dict[int, int] = {}
+    for keyword, sections in index.items():
+        if keyword in prompt:
+            for i in sections:
+                hits[i] = hits.get(i, 0) + len(keyword) # 긴 키워드일수록 구체적인 의도
+    if not hits: return CHAT_FALLBACK_RESPONSE
+
+    best = max(hits, key=lambda i: (hits[i], -i))
+    item = analytics[best]
+    return f"음, 그건 내 전문이지. 위에 적힌 '{item['title']}'을 보게나.\n\n{summarize_section(item['content'])}"
@@ -0,0 +1,143 @@
+from typing import Dict, List, Sequence
+
+import saju_engine
+
+# ==========================================
+# 1. 신살 정의 (Shinsal Stars)
+# ==========================================
+# 각 신살은 비트 1개. 키는 shinsal_db.json의 basic_meanings 키와 동일
+SHINSAL_KEYS = [
+    '도화살(Peach_Blossom)', '역마살(Stationary_Horse)', '화개살(Art_Cover)',
+    '천을귀인(Noble_Helper)', '양인살(Sheep_Blade)', '문창귀인(Literary_Star)',
+    '공망(Void)', '귀문관살(Ghost_Gate)', '원진살(Resentment)',
+]
+SHINSAL_BITS = {key: 1 << i for i, key in enumerate(SHINSAL_KEYS)}
+
+PILLAR_POSITIONS = ['year', 'month', 'day', 'time']
+POSITION_LABELS = {'year': '연지', 'month': '월지', 'day': '일지', 'time': '시지'}
+
+# 기준 지지(연지/일지)가 속한 삼합 그룹 -> 해당 신살이 붙는 지지
+# 그룹 번호 = 지지 인덱스 % 4 (0: 신자진, 1: 사유축, 2: 인오술, 3: 해묘미)
+_SAMHAP_TARGETS = {
+    '도화살(Peach_Blossom)': ['유', '오', '묘', '자'],
+    '역마살(Stationary_Horse)': ['인', '해', '신', '사'],
+    '화개살(Art_Cover)': ['진', '축', '술', '미'],
+}
+# 기준 지지와 짝을 이루면 성립하는 지지 쌍
+_PAIR_STARS = {
+    '귀문관살(Ghost_Gate)': [('자', '유'), ('축', '오'), ('인', '미'), ('묘', '신'), ('진', '해'), ('사', '술')],
+    '원진살(Resentment)': [('자', '미'), ('축', '오'), ('인', '유'), ('묘', '신'), ('진', '해'), ('사', '술')],
+}
+# 일간 기준 신살 (일간 -> 해당 지지)
+_STEM_TARGETS = {
+    '천을귀인(Noble_Helper)': {
+        '갑': ['축', '미'], '무': ['축', '미'], '경': ['축', '미'], '을': ['자', '신'], '기': ['자', '신'],
+        '병': ['해', '유'], '정': ['해', '유'], '신': ['인', '오'], '임': ['사', '묘'], '계': ['사', '묘'],
+    },
+    '양인살(Sheep_Blade)': {'갑': ['묘'], '병': ['오'], '무': ['오'], '경': ['유'], '임': ['자']},
+    '문창귀인(Literary_Star)': {
+        '갑': ['사'], '을': ['오'], '병': ['신'], '정': ['유'], '무': ['신'],
+        '기': ['유'], '경': ['해'], '신': ['자'], '임': ['인'], '계': ['묘'],
+    },
+}
+
+# ==========================================
+# 2. 룩업 테이블 생성 (Precomputed Tables)
+# ==========================================
+JI_INDEX, GAN_INDEX = saju_engine.JI_INDEX, saju_engine.GAN_INDEX
+
+def _build_branch_masks() -> List[List[int]]:
+    """12x12: [기준 지지][대상 지지] -> 신살 비트"""
+    masks = [[0] * 12 for _ in range(12)]
+    for ref in range(12):
+        for star, targets in _SAMHAP_TARGETS.items():
+            masks[ref][JI_INDEX[targets[ref % 4]]] |= SHINSAL_BITS[star]
+    for star, pairs in _PAIR_STARS.items():
+        for a, b in pairs:
+            masks[JI_INDEX[a]][JI_INDEX[b]] |= SHINSAL_BITS[star]
+            masks[JI_INDEX[b]][JI_INDEX[a]] |= SHINSAL_BITS[star]
+    return masks
+
+def _build_stem_masks() -> List[List[int]]:
+    """10x12: [일간][대상 지지] -> 신살 비트"""
+    masks = [[0] * 12 for _ in range(10)]
+    for star, table in _STEM_TARGETS.items():
+        for gan, targets in table.items():
+            for ji in targets:
+                masks[GAN_INDEX[gan]][JI_INDEX[ji]] |= SHINSAL_BITS[star]
+    return masks
+
+def _build_gongmang_masks() -> List[List[int]]:
+    """60x12: [일주 60갑자 인덱스][대상 지지] -> 공망 비트
+    일주가 속한 순(旬)의 시작 지지에서 10, 11번째 지지가 공망"""
+    masks = [[0] * 12 for _ in range(60)]
+    for i in range(60):
+        xun_start = i - i % 10
+        for offset in (10, 11):
+            masks[i][(xun_start + offset) % 12] |= SHINSAL_BITS['공망(Void)']
+    return masks
+
+BRANCH_MASKS = _build_branch_masks()
+STEM_MASKS = _build_stem_masks()
+GONGMANG_MASKS = _build_gongmang_masks()
+
+# 지지 기준 신살을 볼 때 기준이 되는 자리 (일지 기준 + 연지 기준)
+REFERENCE_POSITIONS = ['day', 'year']
+
+# ==========================================
+# 3. 평가 (Single / Batch)
+# ==========================================
+def evaluate_shinsal(saju_pillars: Dict[str, str]) -> Dict[str, List[str]]:
+    """명식 1개의 신살 -> {신살 키: 해당 자리 목록}. SHINSAL_KEYS 순서로 정렬"""
+    branches = {pos: JI_INDEX[saju_pillars[f'{pos}_ji']] for pos in PILLAR_POSITIONS}
+    day_gan = GAN_INDEX[saju_pillars['day_gan']]
+    day_ganji = saju_engine.get_ganji_index(day_gan, branches['day'])
+
+    position_masks = {pos: STEM_MASKS[day_gan][ji] for pos, ji in branches.items()}
+    for ref_pos in REFERENCE_POSITIONS:
+        ref = branches[ref_pos]
+        for pos, ji in branches.items():
+            if pos != ref_pos: position_masks[pos] |= BRANCH_MASKS[ref][ji]
+    for pos, ji in branches.items():
+        if pos != 'day': position_masks[pos] |= GONGMANG_MASKS[day_ganji][ji]
+
+    found = {}
+    for star in SHINSAL_KEYS:
+        bit = SHINSAL_BITS[star]
+        positions = [pos for pos in PILLAR_POSITIONS if position_masks[pos] & bit]
+        if positions: found[star] = positions
+    return found
+
+def shinsal_mask_to_keys(mask: int) -> List[str]:
+    return [star for star in SHINSAL_KEYS if mask & SHINSAL_BITS[star]]
+
+def evaluate_shinsal_batch(pillar_indices: Sequence[Sequence[int]]):
+    """명식 여러 개를 한 번에 평가 -> 명식별 신살 비트마스크 (numpy uint16 배열)
+    pillar_indices: (N, 8) 정수 배열. 열 순서는 연간, 연지, 월간, 월지, 일간, 일지, 시간, 시지"""
+    import numpy as np # 배치 경로에서만 필요
+
+    p = np.asarray(pillar_indices, dtype=np.int64)
+    branch_masks = np.asarray(BRANCH_MASKS, dtype=np.uint16)
+    stem_masks = np.asarray(STEM_MASKS, dtype=np.uint16)
+    gongmang_masks = np.asarray(GONGMANG_MASKS, dtype=np.uint16)
+
+    branches = {'year': p[:, 1], 'month': p[:, 3], 'day': p[:, 5], 'time': p[:, 7]}
+    day_gan = p[:, 4]
+    day_ganji = saju_engine.get_ganji_index(day_gan, branches['day'])
+
+    mask = np.zeros(len(p), dtype=np.uint16)
+    for pos, ji in branches.items():
+        mask |= stem_masks[day_gan, ji]
+        if pos != 'day': mask |= gongmang_masks[day_ganji, ji]
+    for ref_pos in REFERENCE_POSITIONS:
+        ref = branches[ref_pos]
+        for pos, ji in branches.items():
+            if pos != ref_pos: mask |= branch_masks[ref, ji]
+    return mask
+
+def pillars_to_indices(saju_pillars: Dict[str, str]) -> List[int]:
+    """명식 dict -> evaluate_shinsal_batch 입력 행"""
+    return [
+        (GAN_INDEX if key.endswith('_gan') else JI_INDEX)[saju_pillars[key]]
+        for key in ['year_gan', 'year_ji', 'month_gan', 'month_ji', 'day_gan', 'day_ji', 'time_gan', 'time_ji']
+    ]
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import threading
+import hashlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# ==========================================
+# 1. 동일 요청 합치기 (Single-Flight)
+# ==========================================
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 요청은 계산 1번만 수행하고 결과를 나눠 가짐"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key] # 끝난 계산은 바로 제거 (이후 요청은 캐시/저장소에서 처리)
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+# ==========================================
+# 2. 워커 간 합치기 (Cross-Worker File Lock)
+# ==========================================
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), 'shinryeong_locks')
+# 키마다 파일을 만들면 입력 종류만큼 파일이 쌓이므로, 키 해시로 고정 개수의 락 파일 중 하나를 고름
+# (다른 키가 같은 파일을 쓰면 잠깐 함께 기다릴 뿐 결과에는 영향 없음)
+LOCK_STRIPES = 256
+
+def get_lock_path(key: str, lock_dir: str = DEFAULT_LOCK_DIR) -> str:
+    stripe = int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:4], 'big') % LOCK_STRIPES
+    return os.path.join(lock_dir, f'{stripe:03d}.lock')
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """락 파일 1개에 대한 배타 락 (POSIX flock이라 다른 프로세스/스레드 모두 직렬화, 미지원 환경에서는 통과)"""
+    try:
+        import fcntl
+    except ImportError: # Windows
+        yield
+        return
+
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def cross_worker_lock(key: str, lock_dir: str = DEFAULT_LOCK_DIR) -> Iterator[None]:
+    """같은 머신의 다른 워커 프로세스와 키 단위로 직렬화
+    락을 얻은 뒤 저장소를 다시 조회하면, 먼저 끝난 워커의 결과를 재사용할 수 있음
+    락 파일은 LOCK_STRIPES개로 고정되므로 락 안에서 다른 키의 락을 다시 잡으면 안 됨 (같은 파일이면 교착)
+    오래 쥐는 작업(일괄 동기화 등)은 다른 요청과 스트라이프를 공유하지 않도록 전용 락 파일(file_lock)을 쓸 것"""
+    os.makedirs(lock_dir, exist_ok=True)
+    with file_lock(get_lock_path(key, lock_dir)):
+        yield
+
+# ==========================================
+# 3. 입장 제어 (Admission Control)
+# ==========================================
+class OverloadedError(RuntimeError):
+    """대기열이 가득 찼거나 대기 시간이 초과되어 요청을 거절함"""
+
+class AdmissionController:
+    """동시 계산 수를 max_concurrent로 제한하고, 대기열이 max_queue를 넘으면 즉시 거절
+    (대기 시간이 끝없이 늘어나는 대신 명확한 오류로 부하를 덜어냄)"""
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 32, timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                raise OverloadedError(f"대기열 초과 ({self._waiting}/{self.max_queue})")
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            raise OverloadedError(f"{self.timeout:g}초 동안 처리 슬롯을 얻지 못함")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'waiting': self._waiting, 'max_concurrent': self.max_concurrent, 'max_queue': self.max_queue}
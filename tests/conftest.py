@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 테스트는 저장소 루트의 모듈(saju_engine 등)을 바로 import 함 (실행 위치와 무관하게)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import cohort
+import pillar_table
+import report_store
+import saju_engine
+
+def make_report(i):
+    """지오코딩/천문 계산 없이 만든 개인 리포트 (명식 테이블 인덱스로 명식을 고름)"""
+    saju = pillar_table.get_pillars_from_index(i * 7919)
+    oheng_counts, sibseong_data = saju_engine.calculate_chart_scores(saju)
+    user = {'name': '', 'gender': '남' if i % 2 else '여', 'birth_dt': datetime(1980 + i, 1, 1, 12), 'city': 'Seoul'}
+    return user, {'user': user, 'true_dt': user['birth_dt'], 'saju': saju,
+                  'oheng_counts': oheng_counts, 'sibseong_data': sibseong_data, 'sections': []}
+
+def put_reports(store, indices):
+    ids = []
+    for i in indices:
+        user, report = make_report(i)
+        ids.append(store.put(report_store.make_report_id(user['birth_dt'], user['city'], user['gender']), report))
+    return ids
+
+@pytest.fixture
+def stores(tmp_path):
+    store = report_store.ReportStore(str(tmp_path / 'reports.sqlite3'))
+    yield store, cohort.CohortStore(str(tmp_path / 'cohort'))
+    store.close()
+
+def synced_keys(cohort_store):
+    return sorted(int(k) for k in cohort_store.columns()[0]['report_key'])
+
+def test_reput_report_adds_no_row(stores):
+    store, cohort_store = stores
+    ids = put_reports(store, range(3))
+    assert cohort_store.sync_from_report_store(store) == 3
+
+    store.put(ids[0], store.get(ids[0])) # 같은 ID로 다시 저장 -> 새 seq
+    assert cohort_store.sync_from_report_store(store) == 0
+    assert len(cohort_store) == 3
+    assert synced_keys(cohort_store) == sorted(cohort.get_report_key(r) for r in ids)
+
+def test_second_sync_appends_only_new_seqs(stores):
+    store, cohort_store = stores
+    first = put_reports(store, range(3))
+    assert cohort_store.sync_from_report_store(store) == 3
+
+    second = put_reports(store, range(3, 5))
+    store.put(report_store.make_report_id('love', 'a', 'b'), {'analytics': []}) # 궁합 리포트는 집계하지 않음
+
+    read_seqs = []
+    iter_since = store.iter_since
+    def spy(after_seq=0, batch_size=1000):
+        for item in iter_since(after_seq, batch_size):
+            read_seqs.append(item[0])
+            yield item
+    store.iter_since = spy
+    assert cohort_store.sync_from_report_store(store) == 2
+    assert read_seqs == [4, 5, 6] # 앞선 동기화 이후에 저장된 seq만 읽음
+    assert cohort_store.sync_from_report_store(store) == 0
+    assert len(cohort_store) == 5
+
+    cols, cities = cohort_store.columns()
+    assert [int(k) for k in cols['report_key'][3:]] == [cohort.get_report_key(r) for r in second]
+    assert synced_keys(cohort_store) == sorted(cohort.get_report_key(r) for r in first + second)
+    assert cols['birth_year'].tolist() == [1980 + i for i in range(5)]
+    assert cities == ['Seoul']
+
+def test_sync_rows_match_reports(stores):
+    store, cohort_store = stores
+    put_reports(store, range(4))
+    cohort_store.sync_from_report_store(store)
+
+    cols, _ = cohort_store.columns()
+    for i in range(4):
+        _, report = make_report(i)
+        row = cohort.encode_report(report)
+        assert cols['pillars'][i].tolist() == row['pillars']
+        assert np.allclose(cols['weighted'][i], row['weighted'])
+        assert np.allclose(cols['groups'][i], row['groups'])
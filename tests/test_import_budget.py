@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+# 무거운 의존성은 실제로 쓰는 함수 안에서만 import 되어야 함
+HEAVY_MODULES = ['ephem', 'geopy', 'pandas']
+
+# 새 인터프리터에서 재야 이미 로드된 sys.modules의 영향을 받지 않음
+_PROBE = f"""
+import json, sys, time
+t = time.perf_counter()
+import saju_engine
+elapsed = (time.perf_counter() - t) * 1000
+print(json.dumps({{
+    'elapsed_ms': elapsed,
+    'budget_ms': saju_engine.IMPORT_TIME_BUDGET_MS,
+    'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+def measure_import():
+    result = subprocess.run([sys.executable, '-c', _PROBE], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_import_time_within_budget():
+    samples = [measure_import() for _ in range(RUNS)]
+    median = sorted(s['elapsed_ms'] for s in samples)[RUNS // 2]
+    budget = samples[0]['budget_ms']
+    assert median <= budget, f"saju_engine import {median:.1f} ms > budget {budget} ms"
+
+def test_heavy_modules_not_imported():
+    assert measure_import()['loaded'] == []
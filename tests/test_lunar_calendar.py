@@ -0,0 +1,56 @@
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+import lunar_calendar
+
+# (음력 연, 월, 일, 윤달) -> 한국 양력 날짜
+KNOWN_DATES = [
+    ((1997, 1, 1, False), date(1997, 2, 8)),   # 설날 (중국 음력표는 2월 7일, 한국 표준시 기준으로 하루 늦음)
+    ((2000, 1, 1, False), date(2000, 2, 5)),   # 설날
+    ((2024, 1, 1, False), date(2024, 2, 10)),  # 설날
+    ((2023, 2, 1, True), date(2023, 3, 22)),   # 윤2월 초하루
+    ((2023, 8, 15, False), date(2023, 9, 29)), # 추석
+]
+
+@pytest.mark.parametrize("lunar, solar", KNOWN_DATES)
+def test_known_dates(lunar, solar):
+    assert lunar_calendar.lunar_to_solar(*lunar) == solar
+    assert lunar_calendar.solar_to_lunar(solar) == lunar
+
+def test_missing_leap_month():
+    assert lunar_calendar.get_leap_month(2024) == 0
+    with pytest.raises(ValueError, match="윤2월"):
+        lunar_calendar.lunar_to_solar(2024, 2, 1, is_leap=True)
+
+def test_day_30_in_short_month():
+    assert lunar_calendar.get_month_days(1951, 2) == 29
+    with pytest.raises(ValueError, match="29일까지"):
+        lunar_calendar.lunar_to_solar(1951, 2, 30)
+    assert lunar_calendar.lunar_to_solar(1952, 2, 30) == date(1952, 3, 25) # 큰달의 30일은 허용
+
+@pytest.mark.parametrize("year", [lunar_calendar.LUNAR_MIN_YEAR - 1, lunar_calendar.LUNAR_MAX_YEAR + 1])
+def test_year_out_of_range(year):
+    with pytest.raises(ValueError):
+        lunar_calendar.lunar_to_solar(year, 1, 1)
+
+def test_batch_matches_scalar():
+    rng = random.Random(0)
+    dates = []
+    for _ in range(2000):
+        year = rng.randint(lunar_calendar.LUNAR_MIN_YEAR, lunar_calendar.LUNAR_MAX_YEAR)
+        month, is_leap, days = rng.choice(lunar_calendar.get_year_months(year))
+        dates.append((year, month, rng.randint(1, days), is_leap))
+    years, months, days, leaps = zip(*dates)
+
+    batch = lunar_calendar.lunar_to_solar_batch(years, months, days, leaps)
+    expected = np.array([lunar_calendar.lunar_to_solar(*d) for d in dates], dtype='datetime64[D]')
+    assert np.array_equal(batch, expected)
+
+def test_batch_rejects_invalid_dates():
+    with pytest.raises(ValueError):
+        lunar_calendar.lunar_to_solar_batch([2023, 2024], [2, 2], [1, 1], [True, True])
+    with pytest.raises(ValueError):
+        lunar_calendar.lunar_to_solar_batch([1951], [2], [30])
@@ -0,0 +1,66 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+import pillar_table
+import rules
+import saju_engine
+
+def compile_single(cond, rule_id='custom', variable_scopes=None):
+    return rules.compile_rules({'rules': [{'id': rule_id, 'all': [cond]}]}, variable_scopes)
+
+@pytest.mark.parametrize("cond, message", [
+    ({'var': '재성', 'op': '=>', 'value': 3.0}, "연산자"),                       # 잘못된 연산자
+    ({'var': '재물', 'op': '>=', 'value': 3.0}, "알 수 없는 변수"),               # 없는 변수
+    ({'sum': ['비겁', '인셩'], 'op': '<=', 'value': 3.0}, "알 수 없는 변수"),     # sum 안의 오타
+    ({'var': '재성', 'op': '>=', 'value': '3.0'}, "값 타입"),                     # 수치 변수에 문자열 값
+    ({'var': '재성', 'op': '>=', 'value': True}, "값 타입"),                      # bool은 숫자로 보지 않음
+    ({'var': 'gender', 'op': '==', 'value': 1}, "값 타입"),                       # 문자열 변수에 숫자 값
+    ({'var': 'gender', 'op': '>=', 'value': '남'}, "==, !=, in"),                 # 문자열 변수에 대소 비교
+    ({'var': 'day_pillar', 'op': 'in', 'value': '경진'}, "목록"),                 # in에 목록이 아닌 값
+])
+def test_compile_rejects_bad_condition(cond, message):
+    with pytest.raises(ValueError, match=message):
+        compile_single(cond)
+
+def test_compile_rejects_out_of_scope_variable():
+    # 건강 플래그는 오행 가중치만 넘겨받으므로 십성 변수를 쓰면 거부
+    cond = {'var': '재성', 'op': '>=', 'value': 3.0}
+    with pytest.raises(ValueError, match="쓸 수 없는 변수"):
+        compile_single(cond, 'dry_hot', saju_engine.RULE_VARIABLE_SCOPES)
+    assert 'custom' in compile_single(cond, 'custom', saju_engine.RULE_VARIABLE_SCOPES) # 범위 밖 ID는 전체 변수 허용
+
+def test_compile_rejects_missing_required_rule():
+    renamed = copy.deepcopy(rules.DEFAULT_RULES)
+    renamed['rules'][0]['id'] = 'gwegang_v2'
+    with pytest.raises(ValueError, match="gwegang"):
+        rules.compile_rules(renamed, saju_engine.RULE_VARIABLE_SCOPES, saju_engine.REQUIRED_RULE_IDS)
+
+def test_rule_file_and_defaults_compile():
+    for rule_json in [saju_engine.load_db_file('classification_rules'), rules.DEFAULT_RULES]:
+        compiled = rules.compile_rules(rule_json, saju_engine.RULE_VARIABLE_SCOPES, saju_engine.REQUIRED_RULE_IDS)
+        assert set(saju_engine.REQUIRED_RULE_IDS) <= set(compiled)
+
+def test_tag_charts_matches_per_chart_flags():
+    rng = random.Random(0)
+    charts = [pillar_table.get_pillars_from_index(rng.randrange(pillar_table.TABLE_SIZE)) for _ in range(2000)]
+    genders = [rng.choice(['남', '여', '?']) for _ in charts]
+    scores = [saju_engine.calculate_chart_scores(c) for c in charts]
+
+    columns = rules.build_rule_columns(
+        [[o['weighted'][k] for k in rules.OHENG_COLUMNS] for o, _ in scores],
+        [[s['group_counts'][k] for k in rules.GROUP_COLUMNS] for _, s in scores],
+        genders, [c['day_gan'] + c['day_ji'] for c in charts],
+    )
+    tags = saju_engine.tag_charts(columns)
+
+    for i, (chart, (oheng, sibseong), gender) in enumerate(zip(charts, scores, genders)):
+        expected = {
+            **saju_engine.calculate_health_flags(oheng),
+            **saju_engine.calculate_risk_flags(chart, sibseong),
+            **saju_engine.calculate_love_flags(sibseong, gender),
+        }
+        assert {rule_id: bool(tags[rule_id][i]) for rule_id in expected} == expected, chart
+    assert all(np.asarray(tags[rule_id]).any() for rule_id in ['jaedasin_yak', 'dry_hot', 'gwegang']) # 규칙이 실제로 걸리는 표본인지
@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+
+import pillar_table
+import shinsal
+
+def make_chart(year, month, day, time):
+    """'병술' 같은 간지 4개 -> 명식 dict"""
+    chart = {}
+    for pos, ganji in zip(shinsal.PILLAR_POSITIONS, [year, month, day, time]):
+        chart[f'{pos}_gan'], chart[f'{pos}_ji'] = ganji[0], ganji[1]
+    return chart
+
+def to_mask(found):
+    mask = 0
+    for star in found: mask |= shinsal.SHINSAL_BITS[star]
+    return mask
+
+def test_batch_matches_single_on_random_charts():
+    rng = random.Random(0)
+    charts = [pillar_table.get_pillars_from_index(rng.randrange(pillar_table.TABLE_SIZE)) for _ in range(5000)]
+    batch = shinsal.evaluate_shinsal_batch([shinsal.pillars_to_indices(c) for c in charts])
+    single = np.array([to_mask(shinsal.evaluate_shinsal(c)) for c in charts], dtype=np.uint16)
+    assert np.array_equal(batch, single)
+
+def test_gongmang():
+    # 갑자일주는 갑자순(甲子旬) -> 술, 해가 공망. 일지 자리는 공망으로 보지 않음
+    found = shinsal.evaluate_shinsal(make_chart('병술', '경오', '갑자', '을해'))
+    assert found['공망(Void)'] == ['year', 'time']
+
+def test_gongmang_follows_day_pillar_xun():
+    # 갑오일주는 갑오순 -> 진, 사가 공망 (술/해는 해당 없음)
+    assert '공망(Void)' not in shinsal.evaluate_shinsal(make_chart('병술', '경오', '갑오', '을해'))
+    assert shinsal.evaluate_shinsal(make_chart('갑진', '경오', '갑오', '기사'))['공망(Void)'] == ['year', 'time']
+
+def test_noble_helper_and_sheep_blade():
+    # 갑 일간: 천을귀인 축/미, 양인 묘
+    found = shinsal.evaluate_shinsal(make_chart('정축', '정묘', '갑오', '신미'))
+    assert found['천을귀인(Noble_Helper)'] == ['year', 'time']
+    assert found['양인살(Sheep_Blade)'] == ['month']
+
+def test_sheep_blade_only_for_yang_stems():
+    # 을 일간은 양인 대상 지지가 없음
+    found = shinsal.evaluate_shinsal(make_chart('정묘', '정묘', '을묘', '기묘'))
+    assert '양인살(Sheep_Blade)' not in found